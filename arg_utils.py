@@ -2,10 +2,12 @@
 The module contains standard functions to parse arguments of a command line of a program
 and to return parameters list as argparse.Namespace object
 
-There are 3 functions:
+There are 5 functions:
     - a function with 2 args: filename for data set and print option
     - a function with 1 arg: filename for data set
     - a function for training model and prediction: vary a number of parameters
+    - a function for the prediction service
+    - a function for the search of hyperparameters
 
   Typical usage example:
 
@@ -31,23 +33,326 @@ def options_parse_model(is_predict: bool = False):
                         help="A name for input dataset")
     parser.add_argument("thetas_file",
                         type=str,
-                        help="A name for file for saving of LG coefficients")
+                        help="A name of the model: a directory of the model bundle "
+                             "(or .npy file of LG coefficients of old versions)")
     parser.add_argument("-f",
                         dest="features_list_filename",
                         type=str,
                         action="store",
-                        help="A name for file with list of numbers of features")
+                        help="A name for file with list of numbers of features "
+                             "(a model bundle keeps its own list for prediction)")
+    parser.add_argument("-m", "--mmap",
+                        dest="mmap_file",
+                        type=str,
+                        action="store",
+                        help="A name for .npy file to keep the design matrix memory-mapped "
+                             "(training and prediction by .npy thetas of old versions)")
+    parser.add_argument("--dtype",
+                        dest="dtype",
+                        choices=['float64', 'float32'],
+                        default='float64',
+                        help="A float type of computations of the model")
+    parser.add_argument("--stream", "-s",
+                        dest="stream",
+                        action="store_true",
+                        help="Read the data set by blocks of rows: for each epoch of "
+                             "stochastic solvers in training, with bounded memory in prediction")
+    parser.add_argument("--block_size", "-b",
+                        dest="block_size",
+                        type=int,
+                        default=100000,
+                        action="store",
+                        help="A number of rows in a block for stream mode")
     if is_predict:
+        parser.add_argument("--output", "-o",
+                            dest="output",
+                            type=str,
+                            default='houses.csv',
+                            action="store",
+                            help="A name of file for predictions, .gz files are compressed")
+        parser.add_argument("--gzip",
+                            dest="gzip",
+                            action="store_true",
+                            help="Compress the file of predictions by gzip")
+        parser.add_argument("--atomic",
+                            dest="atomic",
+                            action="store_true",
+                            default=None,
+                            help="Write predictions to a temporary file and rename it, "
+                                 "the default without stream mode")
+        parser.add_argument("--no_atomic",
+                            dest="atomic",
+                            action="store_false",
+                            help="Write predictions directly to the file, the default of "
+                                 "stream mode: output can be read while it is written")
+    if not is_predict:
+        parser.add_argument("--dtype_check",
+                            dest="dtype_check",
+                            type=float,
+                            action="store",
+                            help="A tolerance of accuracy of float32 model: the model is "
+                                 "compared with float64 model trained the same way")
         parser.add_argument('-a', '--alpha',
                             dest="alpha",
-                            type=int,
+                            type=float,
+                            default=5e-5,
                             action="store",
-                            help="alpha parameter")
+                            help="An alpha step (a learning rate) of gradient descent")
         parser.add_argument('-n', '--n_iter',
                             dest="n_iter",
                             type=int,
+                            default=30000,
+                            action="store",
+                            help="A number of iterations (max number for solvers with "
+                                 "a line search)")
+        parser.add_argument("--decay",
+                            dest="decay",
+                            type=float,
+                            default=0.0,
+                            action="store",
+                            help="A decay of the alpha step: alpha / (1 + decay * iteration)")
+        parser.add_argument("--legacy_thetas",
+                            dest="legacy_thetas",
+                            action="store_true",
+                            help="Save LG coefficients as .npy array of pairs (thetas, house) "
+                                 "of old versions instead of a model bundle")
+        parser.add_argument("--warm_start", "--warm-start",
+                            dest="warm_start",
+                            type=str,
+                            action="store",
+                            help="A name of file with thetas of a previous model "
+                                 "to start training from them")
+        parser.add_argument("--checkpoint",
+                            dest="checkpoint",
+                            type=str,
+                            action="store",
+                            help="A name of directory to save checkpoints of training "
+                                 "(gd solver in one process and stochastic solvers)")
+        parser.add_argument("--checkpoint_every",
+                            dest="checkpoint_every",
+                            type=int,
+                            default=1000,
+                            action="store",
+                            help="A number of iterations of gd solver between checkpoints, "
+                                 "stochastic solvers save a checkpoint after each epoch")
+        parser.add_argument("--resume",
+                            dest="resume",
+                            action="store_true",
+                            help="Continue training from the checkpoint, the default checkpoint "
+                                 "is <thetas_file>.checkpoint")
+        parser.add_argument("--optimizer",
+                            dest="optimizer",
+                            choices=['gd', 'momentum', 'adam', 'backtracking'],
+                            default='gd',
+                            help="An update rule of gradient descent: plain steps, momentum, "
+                                 "Adam or backtracking control of the step size")
+        parser.add_argument("--momentum",
+                            dest="momentum",
+                            type=float,
+                            default=0.9,
+                            action="store",
+                            help="A coefficient of momentum")
+        parser.add_argument("--beta1",
+                            dest="beta1",
+                            type=float,
+                            default=0.9,
+                            action="store",
+                            help="A decay rate of the first moment of Adam")
+        parser.add_argument("--beta2",
+                            dest="beta2",
+                            type=float,
+                            default=0.999,
+                            action="store",
+                            help="A decay rate of the second moment of Adam")
+        parser.add_argument("--mode",
+                            dest="mode",
+                            choices=['ovr', 'stacked', 'softmax'],
+                            default='stacked',
+                            help="A mode of training: one-vs-rest classifiers one by one, "
+                                 "all one-vs-rest classifiers at once or the softmax model")
+        parser.add_argument("--jobs", "-j",
+                            dest="jobs",
+                            type=int,
+                            default=1,
                             action="store",
-                            help="A number of iterations")
+                            help="A number of worker processes to train classifiers "
+                                 "of classes in 'ovr' mode by gd solver")
+        parser.add_argument("--tol",
+                            dest="tol",
+                            type=float,
+                            action="store",
+                            help="A tolerance of early stopping of gradient descent, "
+                                 "by default all iterations are done")
+        parser.add_argument("--check_every",
+                            dest="check_every",
+                            type=int,
+                            default=100,
+                            action="store",
+                            help="A number of iterations between checks of convergence")
+        parser.add_argument("--criterion",
+                            dest="criterion",
+                            choices=['gradient', 'loss'],
+                            default='gradient',
+                            help="A criterion of convergence: a norm of the mean gradient or "
+                                 "a decrease of the log loss between checks")
+        parser.add_argument("--solver",
+                            dest="solver",
+                            choices=['gd', 'minibatch', 'sgd', 'newton', 'lbfgs'],
+                            default='gd',
+                            help="A solver: full-batch gradient descent, mini-batch or "
+                                 "stochastic gradient descent, Newton (IRLS) or L-BFGS")
+        parser.add_argument("--batch_size",
+                            dest="batch_size",
+                            type=int,
+                            default=32,
+                            action="store",
+                            help="A number of rows in a batch of 'minibatch' solver")
+        parser.add_argument("--epochs",
+                            dest="epochs",
+                            type=int,
+                            default=10,
+                            action="store",
+                            help="A number of passes over the data set for stochastic solvers")
+        parser.add_argument("--eta0",
+                            dest="eta0",
+                            type=float,
+                            default=0.5,
+                            action="store",
+                            help="An initial learning rate of stochastic solvers")
+        parser.add_argument("--schedule",
+                            dest="schedule",
+                            choices=['constant', 'invscaling'],
+                            default='invscaling',
+                            help="A schedule of learning rate of stochastic solvers")
+        parser.add_argument("--no_shuffle",
+                            dest="shuffle",
+                            action="store_false",
+                            help="Do not shuffle rows before each epoch")
+        parser.add_argument("--seed",
+                            dest="seed",
+                            type=int,
+                            default=0,
+                            action="store",
+                            help="A seed for shuffling of rows")
+    return parser.parse_args()
+
+
+def options_parse_serve() -> argparse.Namespace:
+    """
+    The function extracts arguments of command line of the prediction service and
+    return them as parameters of the program.
+    A validation is performing in argparse library module.
+
+    Returns:
+        Parameters list as argparse.Namespace object
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model",
+                        type=str,
+                        help="A name of directory of the model bundle")
+    parser.add_argument("--host",
+                        dest="host",
+                        type=str,
+                        default='127.0.0.1',
+                        action="store",
+                        help="A host to listen on")
+    parser.add_argument("--port", "-p",
+                        dest="port",
+                        type=int,
+                        default=8080,
+                        action="store",
+                        help="A TCP port to listen on")
+    parser.add_argument("--unix",
+                        dest="unix",
+                        type=str,
+                        action="store",
+                        help="A path of Unix socket to listen on instead of TCP port")
+    parser.add_argument("--dtype",
+                        dest="dtype",
+                        choices=['float64', 'float32'],
+                        help="A float type of computations of the model, "
+                             "by default the type of training")
+    parser.add_argument("--max_batch",
+                        dest="max_batch",
+                        type=int,
+                        default=65536,
+                        action="store",
+                        help="A max number of rows in a micro-batch of concurrent requests")
+    parser.add_argument("--max_delay",
+                        dest="max_delay",
+                        type=float,
+                        default=2.0,
+                        action="store",
+                        help="A max time in milliseconds to wait for concurrent requests "
+                             "to join a micro-batch")
+    return parser.parse_args()
+
+
+def options_parse_tune() -> argparse.Namespace:
+    """
+    The function extracts arguments of command line of the search of hyperparameters and
+    return them as parameters of the program.
+    A validation is performing in argparse library module.
+
+    Returns:
+        Parameters list as argparse.Namespace object
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filename_dataset",
+                        type=str,
+                        help="A name for input dataset")
+    parser.add_argument("model",
+                        type=str,
+                        help="A name of directory to save the model bundle of the best "
+                             "configuration")
+    parser.add_argument("--features", "-f",
+                        dest="features",
+                        type=str,
+                        nargs='+',
+                        default=[None],
+                        help="Names of files with lists of numbers of features to compare, "
+                             "by default all features")
+    parser.add_argument('--alpha', '-a',
+                        dest="alpha",
+                        type=float,
+                        nargs='+',
+                        default=[5e-5],
+                        help="Alpha steps (learning rates) of gradient descent to compare")
+    parser.add_argument('--n_iter', '-n',
+                        dest="n_iter",
+                        type=int,
+                        nargs='+',
+                        default=[30000],
+                        help="Numbers of iterations to compare")
+    parser.add_argument("--mode",
+                        dest="mode",
+                        choices=['ovr', 'stacked', 'softmax'],
+                        default='stacked',
+                        help="A mode of training")
+    parser.add_argument("--solver",
+                        dest="solver",
+                        choices=['gd', 'minibatch', 'sgd', 'newton', 'lbfgs'],
+                        default='gd',
+                        help="A solver of training")
+    parser.add_argument("--folds", "-k",
+                        dest="folds",
+                        type=int,
+                        default=5,
+                        action="store",
+                        help="A number of folds of cross-validation")
+    parser.add_argument("--jobs", "-j",
+                        dest="jobs",
+                        type=int,
+                        default=1,
+                        action="store",
+                        help="A number of worker processes: a fold of a configuration "
+                             "is a task")
+    parser.add_argument("--seed",
+                        dest="seed",
+                        type=int,
+                        default=0,
+                        action="store",
+                        help="A seed for splitting of rows into folds")
     return parser.parse_args()
 
 
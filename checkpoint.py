@@ -0,0 +1,65 @@
+"""
+The module contains functions to save and to load checkpoints of training:
+arrays of a state of training (thetas, a state of the update rule and so on),
+a configuration of training and a position in the loop of training.
+A checkpoint is a set of arrays of NPY_STORE module, so it is written atomically
+and it is loaded without pickle. A checkpoint can be used only by training
+with the same configuration.
+
+  Typical usage example:
+
+  save_checkpoint(path, {'thetas': thetas}, config, {'iteration': 1000})
+  arrays, position = load_checkpoint(path, config)
+"""
+
+import json
+from typing import Dict, Optional, Tuple
+import numpy as np  # type: ignore
+from npy_store import find_arrays, save_arrays, load_arrays
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(path: str, arrays: Dict[str, np.array], config: dict,
+                    position: dict) -> None:
+    """
+    The function saves a checkpoint of training, an old checkpoint is replaced
+
+    Args:
+        path: a name of the checkpoint directory
+        arrays: a dictionary: a name of an array -> the array
+        config: a configuration of training, it has to be serializable to JSON
+        position: a position in training, it has to be serializable to JSON
+    """
+    save_arrays(path, arrays, {'version': CHECKPOINT_VERSION, 'config': config,
+                               'position': position})
+
+
+def load_checkpoint(path: str, config: dict) -> Optional[Tuple[Dict[str, np.array], dict]]:
+    """
+    The function loads a checkpoint of training
+
+    Args:
+        path: a name of the checkpoint directory
+        config: a configuration of current training
+
+    Returns:
+        - a dictionary: a name of an array -> the array
+        - a position in training
+        None if there is no checkpoint
+
+    Raises:
+        ValueError: the checkpoint is damaged or it was saved by training
+          with other configuration
+    """
+    if find_arrays(path) is None:
+        return None
+    try:
+        arrays, header = load_arrays(path, mmap_mode=None)
+        position = header['position']
+    except (OSError, ValueError, KeyError) as exception:
+        raise ValueError(f'{path}: a checkpoint is damaged') from exception
+    if header.get('version') != CHECKPOINT_VERSION or \
+            header.get('config') != json.loads(json.dumps(config)):
+        raise ValueError(f'{path}: a checkpoint does not correspond to parameters of training')
+    return arrays, position
@@ -1,24 +1,71 @@
 """
 The module contains functions to work with csv files:
 - to load data from the dataset as a csv file
-- to save a array of predictions to file houses.csv
+- to load data from the dataset as typed columns: a float matrix and encoded strings
+- to read data from the dataset by blocks of rows as typed columns, from any row offset
+- to save a array of predictions to csv file (houses.csv by default): by blocks of rows,
+  optionally compressed by gzip, atomically by renaming of a temporary file
 - to load a list of numbers of features, divided by comma
 
   Typical usage examples:
 
   dataset = load_scv(args)
+  typed_dataset = load_csv_typed(args)
+  typed_dataset = select_features(typed_dataset, features_list)
+  for block in iter_csv_typed(args, block_size=100000): ...
+  for block, offset in iter_csv_blocks(args, offset=offset): ...
   save_houses(list_of_str)
+  save_houses(list_of_str, 'houses.csv.gz')
+  with open_output('houses.csv', atomic=False) as data_file: ...
   features_list = get_features_list(features_list_filename)
 """
 
+import io
+import os
 import sys
 import csv
+import gzip
+import itertools
+import locale
+import warnings
 import argparse
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import List, Optional, Dict, NamedTuple, Tuple, Iterator, TextIO
 import numpy as np  # type: ignore
 from stream_funcs import error_message, success_message, normal_message
 
 
+INDEX_COLUMN = 0
+FIRST_FEATURE_COLUMN = 6
+DEFAULT_BLOCK_SIZE = 100000
+HOUSES_FILE = 'houses.csv'
+HOUSES_HEADER = 'Index,Hogwarts House\n'
+OUTPUT_BLOCK_SIZE = 65536
+OUTPUT_BUFFER_SIZE = 1 << 20
+GZIP_LEVEL = 1
+
+
+class TypedDataset(NamedTuple):
+    """
+    TypedDataset is a data set loaded from csv file as typed columns
+
+    Attributes:
+        header: a list of names of all columns of the csv file
+        index: values of the index column as a float array
+        features: a contiguous float matrix with values of numerical features
+        feature_names: a list of names of numerical features (columns of the matrix)
+        codes: a dictionary: a name of a string column -> an array of codes of values
+        categories: a dictionary: a name of a string column -> a list of values,
+          a code is an index in this list
+    """
+    header: List[str]
+    index: np.array
+    features: np.array
+    feature_names: List[str]
+    codes: Dict[str, np.array]
+    categories: Dict[str, List[str]]
+
+
 def get_feature_list(features_list_filename: Optional[str]) -> List[int]:
     """
     The function gets a file name with with a list of numbers of features, divided by comma,
@@ -103,21 +150,414 @@ def load_csv(args: argparse.Namespace, if_feature_list: bool = False) -> np.arra
         sys.exit(1)
 
 
-def save_houses(predictions: List[str]) -> None:
+def _to_float(cells: np.array) -> Optional[np.array]:
+    """
+    The function converts an array of strings to a float array.
+    Empty strings are converted to nan values.
+
+    Args:
+        cells: an array of strings
+
+    Returns:
+        A float array or None if there are not numerical values in the array
+    """
+    try:
+        return np.where(cells == '', 'nan', cells).astype(np.float64)
+    except ValueError:
+        return None
+
+
+def _encode(cells: np.array, encoder: Optional[Dict[str, int]] = None) -> \
+        Tuple[np.array, List[str]]:
+    """
+    The function encodes a column of strings by a dictionary of its values.
+    If an encoder is not defined then the dictionary is a sorted list of values of the column.
+    Otherwise the encoder is updated by new values: codes of a new value is the next number,
+    so codes are the same for all blocks of a file.
+
+    Args:
+        cells: an array of strings
+        encoder: a dictionary: a value -> a code, it is shared between blocks of a file
+
+    Returns:
+        - an array of codes: indexes of values in the dictionary
+        - a dictionary as a list of values
+    """
+    values, codes = np.unique(cells, return_inverse=True)
+    codes = codes.reshape(-1)
+    if encoder is None:
+        return codes.astype(np.int32), [str(value) for value in values]
+    mapping = np.array([encoder.setdefault(str(value), len(encoder)) for value in values],
+                       dtype=np.int32)
+    return mapping[codes], list(encoder)
+
+
+def _feature_columns(header: List[str], feature_list: List[int]) -> List[int]:
+    """
+    The function returns indexes of columns of features to load
+
+    Args:
+        header: a list of names of columns
+        feature_list: a list of numbers of features to load, empty list to load all features
+
+    Returns:
+        A list of indexes of columns
+    """
+    return [idx for idx in range(FIRST_FEATURE_COLUMN, len(header))
+            if not feature_list or idx - 5 in feature_list]
+
+
+def get_feature_numbers(header: List[str], feature_names: List[str]) -> List[int]:
+    """
+    The function returns numbers of features as in a file with numbers of features
+
+    Args:
+        header: a list of names of columns
+        feature_names: a list of names of features
+
+    Returns:
+        A list of numbers of features
+    """
+    return [header.index(name) - 5 for name in feature_names]
+
+
+def _parse_text(text: str, header: List[str], feature_list: List[int],
+                encoders: Optional[Dict[str, Dict[str, int]]] = None,
+                skiprows: int = 1) -> TypedDataset:
+    """
+    The function converts a text of csv file to a typed data set by NUMPY parser.
+    It is a fast way for regular files: without quoted values and with numerical features only.
+    Empty values of numerical columns are replaced by nan before parsing.
+
+    Args:
+        text: a text of csv file
+        header: a list of names of columns
+        feature_list: a list of numbers of features to load, empty list to load all features
+        encoders: dictionaries to encode string columns, shared between blocks of a file
+        skiprows: a number of rows of the header in the text
+
+    Returns:
+        A typed data set
+
+    Raises:
+        ValueError: the text can not be parsed by NUMPY parser
+    """
+    columns = _feature_columns(header, feature_list)
+    string_columns = list(range(INDEX_COLUMN + 1, FIRST_FEATURE_COLUMN))
+    numeric_text = text.replace(',,', ',nan,').replace(',,', ',nan,').replace(',\n', ',nan\n')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        block = np.loadtxt(io.StringIO(numeric_text), delimiter=',', skiprows=skiprows,
+                           comments=None, usecols=[INDEX_COLUMN] + columns, dtype=np.float64,
+                           ndmin=2)
+        del numeric_text
+        cells = np.loadtxt(io.StringIO(text), delimiter=',', skiprows=skiprows, comments=None,
+                           usecols=string_columns, dtype=str, ndmin=2)
+    codes: Dict[str, np.array] = {}
+    categories: Dict[str, List[str]] = {}
+    for pos, idx in enumerate(string_columns):
+        encoder = None if encoders is None else encoders.setdefault(header[idx], {})
+        codes[header[idx]], categories[header[idx]] = _encode(cells[:, pos], encoder)
+    return TypedDataset(header=header,
+                        index=block[:, 0].copy(),
+                        features=np.ascontiguousarray(block[:, 1:]),
+                        feature_names=[header[idx] for idx in columns],
+                        codes=codes,
+                        categories=categories)
+
+
+def parse_rows(header: List[str], rows: List[List[str]], feature_list: List[int],
+               encoders: Optional[Dict[str, Dict[str, int]]] = None) -> TypedDataset:
+    """
+    The function converts rows of csv file to a typed data set.
+    Index and features columns are converted to floats as a single block.
+    Feature columns with not numerical values and information columns
+    (house, names, birthday, best hand) are encoded by dictionaries.
+
+    Args:
+        header: a list of names of columns
+        rows: a list of rows of csv file without the header
+        feature_list: a list of numbers of features to load, empty list to load all features
+        encoders: dictionaries to encode string columns, shared between blocks of a file
+
+    Returns:
+        A typed data set
+    """
+    cells = np.array(rows, dtype=str).reshape(len(rows), len(header))
+    columns = _feature_columns(header, feature_list)
+    block = _to_float(cells[:, columns])
+    if block is not None:
+        numeric_columns = columns
+    else:
+        converted = [(idx, _to_float(cells[:, idx])) for idx in columns]
+        numeric = [(idx, values) for idx, values in converted if values is not None]
+        numeric_columns = [idx for idx, _ in numeric]
+        block = np.empty((len(rows), len(numeric)), dtype=np.float64)
+        for pos, (_, values) in enumerate(numeric):
+            block[:, pos] = values
+    index = _to_float(cells[:, INDEX_COLUMN])
+    if index is None:
+        index = np.arange(len(rows), dtype=np.float64)
+    string_columns = [idx for idx in list(range(INDEX_COLUMN + 1, FIRST_FEATURE_COLUMN)) + columns
+                      if idx not in numeric_columns]
+    codes: Dict[str, np.array] = {}
+    categories: Dict[str, List[str]] = {}
+    for idx in string_columns:
+        encoder = None if encoders is None else encoders.setdefault(header[idx], {})
+        codes[header[idx]], categories[header[idx]] = _encode(cells[:, idx], encoder)
+    return TypedDataset(header=header,
+                        index=index,
+                        features=np.ascontiguousarray(block),
+                        feature_names=[header[idx] for idx in numeric_columns],
+                        codes=codes,
+                        categories=categories)
+
+
+def parse_csv_text(text: str, feature_list: List[int]) -> TypedDataset:
+    """
+    The function converts a text of csv file with the header to a typed data set.
+    Regular texts are parsed by NUMPY parser, other texts are parsed row by row.
+
+    Args:
+        text: a text of csv file
+        feature_list: a list of numbers of features to load, empty list to load all features
+
+    Returns:
+        A typed data set
+
+    Raises:
+        StopIteration: the text is empty
+        ValueError: rows of the text have different lengths
+    """
+    header = next(csv.reader(io.StringIO(text)))
+    try:
+        return _parse_text(text, header, feature_list)
+    except ValueError:
+        return parse_rows(header, list(csv.reader(io.StringIO(text)))[1:], feature_list)
+
+
+def select_features(dataset: TypedDataset, feature_list: List[int]) -> TypedDataset:
+    """
+    The function selects features from a typed data set which is loaded with all features.
+    The result is the same as a data set loaded with the list of numbers of features.
+
+    Args:
+        dataset: a typed data set
+        feature_list: a list of numbers of features, empty list to select all features
+
+    Returns:
+        A typed data set
+    """
+    if not feature_list:
+        return dataset
+    selected = set(_feature_columns(dataset.header, feature_list))
+    positions = [pos for pos, name in enumerate(dataset.feature_names)
+                 if dataset.header.index(name) in selected]
+    strings = [name for name in dataset.codes
+               if dataset.header.index(name) < FIRST_FEATURE_COLUMN or
+               dataset.header.index(name) in selected]
+    return TypedDataset(header=dataset.header,
+                        index=dataset.index,
+                        features=np.ascontiguousarray(dataset.features[:, positions]),
+                        feature_names=[dataset.feature_names[pos] for pos in positions],
+                        codes={name: dataset.codes[name] for name in strings},
+                        categories={name: dataset.categories[name] for name in strings})
+
+
+def load_csv_typed(args: argparse.Namespace, if_feature_list: bool = False) -> TypedDataset:
+    """
+    The function loads data from csv file and returns dataset as typed columns:
+    a contiguous float matrix of numerical features and dictionary-encoded string columns.
+    Features are selected by file 'features_list_filename' as in load_csv function.
+    Regular files are parsed by NUMPY parser, other files are parsed row by row.
+
+    Args:
+        args: parameters list as argparse.Namespace object
+        if_feature_list: option to load feature list from file, uses only
+        to train model and predict
+
+    Returns:
+        A typed data set
+    """
+    try:
+        feature_list = get_feature_list(args.features_list_filename) \
+            if if_feature_list else []
+        with open(args.filename_dataset) as csv_file:
+            return parse_csv_text(csv_file.read(), feature_list)
+    except (FileExistsError, FileNotFoundError, csv.Error):
+        data = sys.exc_info()[1]
+        if data is not None:
+            error_message(f'file {args.filename_dataset}: {data.args[-1]}')
+        sys.exit(1)
+    except (StopIteration, ValueError):
+        error_message(f'file {args.filename_dataset}: wrong format of the data set')
+        sys.exit(1)
+
+
+def iter_csv_blocks(args: argparse.Namespace, if_feature_list: bool = False,
+                    block_size: int = DEFAULT_BLOCK_SIZE, offset: int = 0,
+                    feature_list: Optional[List[int]] = None,
+                    complete_rows: bool = False) -> \
+        Iterator[Tuple[TypedDataset, int]]:
+    """
+    The generator loads data from csv file by blocks of rows and yields each block
+    as a typed data set with a byte offset of the end of the block in the file.
+    Reading can be started from a byte offset of a row, e.g. from an offset
+    returned with the last block of previous reading: only appended rows are read.
+    To continue reading later, complete_rows has to be set: an unterminated last line
+    may be a row which is being appended, so it is left for the next reading
+    and the offset stops after the last line break.
+    Features and string columns are processed as in iter_csv_typed function.
+
+    Args:
+        args: parameters list as argparse.Namespace object
+        if_feature_list: option to load feature list from file, uses only
+        to train model and predict
+        block_size: a number of rows in a block
+        offset: a byte offset of the first row to read, 0 to read after the header
+        feature_list: a list of numbers of features to load instead of the file
+          of numbers of features, e.g. features of a model bundle
+        complete_rows: option to skip an unterminated last line of the file
+
+    Yields:
+        A typed data set for each block of rows and a byte offset of the end of the block
+    """
+    try:
+        if feature_list is None:
+            feature_list = get_feature_list(args.features_list_filename) \
+                if if_feature_list else []
+        encoding = locale.getpreferredencoding(False)
+        encoders: Dict[str, Dict[str, int]] = {}
+        feature_names: Optional[List[str]] = None
+        with open(args.filename_dataset, 'rb') as csv_file:
+            header = next(csv.reader([csv_file.readline().decode(encoding)]))
+            if offset:
+                csv_file.seek(offset)
+            while True:
+                raw = b''.join(itertools.islice(csv_file, block_size))
+                end = csv_file.tell()
+                if complete_rows and not raw.endswith(b'\n'):
+                    end -= len(raw) - raw.rfind(b'\n') - 1
+                    raw = raw[:raw.rfind(b'\n') + 1]
+                if not raw:
+                    break
+                text = raw.decode(encoding).replace('\r\n', '\n')
+                try:
+                    block = _parse_text(text, header, feature_list, encoders, skiprows=0)
+                except ValueError:
+                    block = parse_rows(header, list(csv.reader(io.StringIO(text))),
+                                       feature_list, encoders)
+                if feature_names is None:
+                    feature_names = block.feature_names
+                elif block.feature_names != feature_names:
+                    raise ValueError('Numerical features differ between blocks')
+                yield block, end
+    except (FileExistsError, FileNotFoundError, csv.Error):
+        data = sys.exc_info()[1]
+        if data is not None:
+            error_message(f'file {args.filename_dataset}: {data.args[-1]}')
+        sys.exit(1)
+    except (StopIteration, ValueError):
+        error_message(f'file {args.filename_dataset}: wrong format of the data set')
+        sys.exit(1)
+
+
+def iter_csv_typed(args: argparse.Namespace, if_feature_list: bool = False,
+                   block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[TypedDataset]:
+    """
+    The generator loads data from csv file by blocks of rows and yields each block
+    as a typed data set, so the entire file is never loaded in memory.
+    Features are selected by file 'features_list_filename' as in load_csv function.
+    String columns are encoded by dictionaries which are shared between blocks:
+    codes are the same for all blocks, a list of categories of a block
+    contains all values which are met up to the block (in order of appearance).
+
+    Args:
+        args: parameters list as argparse.Namespace object
+        if_feature_list: option to load feature list from file, uses only
+        to train model and predict
+        block_size: a number of rows in a block
+
+    Yields:
+        A typed data set for each block of rows
+    """
+    for block, _ in iter_csv_blocks(args, if_feature_list, block_size):
+        yield block
+
+
+def write_houses(data_file: TextIO, predictions: List[str], start: int = 0) -> int:
+    """
+    The function writes rows of predictions to an open csv file of predictions.
+    Rows are formatted and written by blocks: a single write for a block.
+
+    Args:
+        data_file: a text file
+        predictions: a list of strings is predictions of the model
+        start: an index of the first prediction
+
+    Returns:
+        An index of the next prediction
+    """
+    predictions = np.asarray(predictions)
+    for first in range(0, len(predictions), OUTPUT_BLOCK_SIZE):
+        block = predictions[first:first + OUTPUT_BLOCK_SIZE].tolist()
+        data_file.write(''.join([f'{idx},{house}\n' for idx, house
+                                 in zip(range(start + first, start + first + len(block)),
+                                        block)]))
+    return start + len(predictions)
+
+
+@contextmanager
+def open_output(filename: str, compress: Optional[bool] = None,
+                atomic: bool = True) -> Iterator[TextIO]:
+    """
+    The function opens an output text file with a large buffer.
+    An atomic file is written to a temporary file near it and renamed when it is closed
+    without an exception, so readers never see a partially written file;
+    the temporary file is removed on an exception.
+
+    Args:
+        filename: a name of file
+        compress: whether to compress the file by gzip, None to compress .gz files
+        atomic: whether to replace the file atomically
+
+    Yields:
+        An open text file
+    """
+    if compress is None:
+        compress = filename.endswith('.gz')
+    path = os.path.join(os.path.dirname(filename),
+                        f'.{os.path.basename(filename)}.{os.getpid()}.tmp') \
+        if atomic else filename
+    try:
+        with (gzip.open(path, 'wt', compresslevel=GZIP_LEVEL) if compress
+              else open(path, 'w', buffering=OUTPUT_BUFFER_SIZE)) as data_file:
+            yield data_file
+        if atomic:
+            os.replace(path, filename)
+    finally:
+        if atomic and os.path.exists(path):
+            os.remove(path)
+
+
+def save_houses(predictions: List[str], filename: str = HOUSES_FILE,
+                compress: Optional[bool] = None, atomic: bool = True) -> None:
     """
     The function saves an array of predictions to csv file
 
     Args:
         predictions: a list of strings is predictions of the model
+        filename: a name of file
+        compress: whether to compress the file by gzip, None to compress .gz files
+        atomic: whether to replace the file atomically
     """
     try:
-        with open('houses.csv', 'w') as data_file:
-            data_file.write('Index,Hogwarts House\n')
-            for key in enumerate(predictions):
-                data_file.write('{},{}\n'.format(key[0], key[1]))
-        success_message('Thetas array is saved')
+        with open_output(filename, compress, atomic) as data_file:
+            data_file.write(HOUSES_HEADER)
+            write_houses(data_file, predictions)
+        success_message('Predictions are saved to ' + filename)
     except IOError:
         data = sys.exc_info()[1]
         if data is not None:
-            error_message(str(data.args[1]))
+            error_message(str(data))
         error_message('It is impossible to save predictions')
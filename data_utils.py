@@ -1,17 +1,22 @@
 """
 The module contains functions to process data:
 - to preprocess data from the dataset and to divide the dataset into 3 arrays
+- to preprocess typed data from the dataset into the same 3 arrays with a float matrix
 - to split data between houses
 - to select and return data for one pair of houses divided on different arrays
 
   Typical usage examples:
 
   houses, features, data = preprocessing(dataset)
+  houses, features, data = preprocessing_typed(typed_dataset)
   house_data = get_house_data(data, houses)
   data_x, data_y = get_one_pair_house_data(data_house, houses, row, col)
 """
 from typing import List, Tuple
 import numpy as np  # type: ignore
+from csv_utils import TypedDataset
+
+TARGET_NAME = 'Hogwarts House'
 
 
 def preprocessing(dataset: np.array) -> Tuple[List[str], List[str], np.array]:
@@ -34,11 +39,34 @@ def preprocessing(dataset: np.array) -> Tuple[List[str], List[str], np.array]:
     return sorted(houses), features, data
 
 
+def preprocessing_typed(dataset: TypedDataset, target: str = TARGET_NAME) -> \
+        Tuple[List[str], List[str], np.array]:
+    """
+    The function processes typed data: splits dataset on 3 parts as preprocessing function.
+    Values of features are a float matrix, the first column of the matrix
+    is a code of house: an index in the list of names of houses
+
+    Args:
+        dataset: a typed data set initially loaded from csv file
+        target: a name of target column
+
+    Returns:
+        - sorted list of names of houses
+        - list of names of features
+        - values of features with codes of houses as a float matrix
+    """
+    data = np.empty((len(dataset.index), len(dataset.feature_names) + 1), dtype=np.float64)
+    data[:, 0] = dataset.codes[target]
+    data[:, 1:] = dataset.features
+    return dataset.categories[target], [target] + dataset.feature_names, data
+
+
 def get_house_data(data: np.array, houses: List[str]) -> List[np.array]:
     """
     The function splits data between houses and returns array of values of
     features for each house.
-    Length of returning array is equal length of houses array
+    Length of returning array is equal length of houses array.
+    If data is a float matrix then the first column is a code of house.
 
     Args:
         data: a data array
@@ -48,8 +76,10 @@ def get_house_data(data: np.array, houses: List[str]) -> List[np.array]:
         array of values of features for each house
     """
     data_house: List[np.array] = []
+    is_typed = data.dtype != object
     for idx_house, _ in enumerate(houses):
-        data_house.append(data[data[:, 0] == houses[idx_house]])
+        key = idx_house if is_typed else houses[idx_house]
+        data_house.append(data[data[:, 0] == key])
     return data_house
 
 
@@ -72,6 +102,6 @@ def get_one_pair_house_data(data_house: List[np.array],
     data_house_1: List[np.array] = []
     data_house_2: List[np.array] = []
     for idx, _ in enumerate(houses):
-        data_house_1.append(np.array(data_house[idx][:, idx_house_1], dtype=float))
-        data_house_2.append(np.array(data_house[idx][:, idx_house_2], dtype=float))
+        data_house_1.append(np.asarray(data_house[idx][:, idx_house_1], dtype=float))
+        data_house_2.append(np.asarray(data_house[idx][:, idx_house_2], dtype=float))
     return data_house_1, data_house_2
@@ -0,0 +1,189 @@
+"""
+The module contains functions of the binary cache of data sets.
+A csv file is parsed once and saved as typed columns in NUMPY .npy files
+in the directory '.dslr_cache' near the csv file. The cache is keyed on a path, a size,
+a modification time and a content hash of the csv file. Next loads of the same file
+use memory mapping of the cache and skip parsing.
+
+  Typical usage example:
+
+  typed_dataset = load_csv_cached(args)
+  typed_dataset = load_csv_cached(args, True)
+"""
+
+import io
+import os
+import sys
+import csv
+import hashlib
+import argparse
+from typing import Dict, List, Optional
+import numpy as np  # type: ignore
+from csv_utils import TypedDataset, get_feature_list, parse_csv_text, select_features
+from stream_funcs import error_message
+from npy_store import save_arrays, load_arrays, load_header, save_header
+
+CACHE_DIR = '.dslr_cache'
+CACHE_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def get_cache_path(filename: str) -> str:
+    """
+    The function returns a name of the cache directory for csv file
+
+    Args:
+        filename: a name of csv file
+
+    Returns:
+        A name of the cache directory
+    """
+    path = os.path.abspath(filename)
+    key = hashlib.blake2b(path.encode(), digest_size=8).hexdigest()
+    return os.path.join(os.path.dirname(path), CACHE_DIR, os.path.basename(path) + '.' + key)
+
+
+def _file_hash(filename: str) -> str:
+    """
+    The function calculates a content hash of a file
+
+    Args:
+        filename: a name of file
+
+    Returns:
+        A hash as a hex string
+    """
+    digest = hashlib.blake2b()
+    with open(filename, 'rb') as data_file:
+        for block in iter(lambda: data_file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_valid(cache_path: str, header: Optional[dict], stat: os.stat_result,
+              filename: str) -> bool:
+    """
+    The function checks whether the cache corresponds to the csv file.
+    If the size and the modification time are the same then the cache is valid.
+    If only the modification time is changed then the content hash is checked
+    and the new modification time is saved to the cache.
+
+    Args:
+        cache_path: a name of the cache directory
+        header: a header of the cache
+        stat: a result of os.stat for csv file
+        filename: a name of csv file
+
+    Returns:
+        True if the cache is valid
+    """
+    if header is None or header.get('version') != CACHE_VERSION or \
+            header['path'] != os.path.abspath(filename) or header['size'] != stat.st_size:
+        return False
+    if header['mtime_ns'] == stat.st_mtime_ns:
+        return True
+    if header['hash'] != _file_hash(filename):
+        return False
+    header['mtime_ns'] = stat.st_mtime_ns
+    try:
+        save_header(cache_path, header)
+    except OSError:
+        pass
+    return True
+
+
+def _save_cache(cache_path: str, dataset: TypedDataset, filename: str,
+                stat: os.stat_result, content_hash: str) -> None:
+    """
+    The function saves a typed data set to the cache.
+    Errors of writing are ignored: the cache is optional.
+
+    Args:
+        cache_path: a name of the cache directory
+        dataset: a typed data set with all features
+        filename: a name of csv file
+        stat: a result of os.stat for csv file
+        content_hash: a content hash of csv file
+    """
+    strings = list(dataset.codes)
+    codes = np.empty((len(dataset.index), len(strings)), dtype=np.int32)
+    for pos, name in enumerate(strings):
+        codes[:, pos] = dataset.codes[name]
+    header = {'version': CACHE_VERSION,
+              'path': os.path.abspath(filename),
+              'size': stat.st_size,
+              'mtime_ns': stat.st_mtime_ns,
+              'hash': content_hash,
+              'header': dataset.header,
+              'feature_names': dataset.feature_names,
+              'string_columns': strings,
+              'categories': dataset.categories}
+    try:
+        save_arrays(cache_path, {'index': dataset.index,
+                                 'features': dataset.features,
+                                 'codes': codes}, header)
+    except OSError:
+        pass
+
+
+def _load_cache(cache_path: str) -> TypedDataset:
+    """
+    The function loads a typed data set from the cache with memory mapping
+
+    Args:
+        cache_path: a name of the cache directory
+
+    Returns:
+        A typed data set with all features
+    """
+    arrays, header = load_arrays(cache_path)
+    codes: Dict[str, np.array] = {name: arrays['codes'][:, pos]
+                                  for pos, name in enumerate(header['string_columns'])}
+    categories: Dict[str, List[str]] = {name: header['categories'][name]
+                                        for name in header['string_columns']}
+    return TypedDataset(header=header['header'],
+                        index=arrays['index'],
+                        features=arrays['features'],
+                        feature_names=header['feature_names'],
+                        codes=codes,
+                        categories=categories)
+
+
+def load_csv_cached(args: argparse.Namespace, if_feature_list: bool = False) -> TypedDataset:
+    """
+    The function loads data from csv file as typed columns as load_csv_typed function does,
+    but uses the binary cache of the file. If the cache is absent or out of date then
+    the file is parsed and the cache is rebuilt.
+    Arrays of the result are read-only if all features are selected.
+
+    Args:
+        args: parameters list as argparse.Namespace object
+        if_feature_list: option to load feature list from file, uses only
+        to train model and predict
+
+    Returns:
+        A typed data set
+    """
+    feature_list = get_feature_list(args.features_list_filename) if if_feature_list else []
+    cache_path = get_cache_path(args.filename_dataset)
+    try:
+        stat = os.stat(args.filename_dataset)
+        if _is_valid(cache_path, load_header(cache_path), stat, args.filename_dataset):
+            try:
+                return select_features(_load_cache(cache_path), feature_list)
+            except (OSError, ValueError, KeyError):
+                pass
+        with open(args.filename_dataset, 'rb') as csv_file:
+            raw = csv_file.read()
+        dataset = parse_csv_text(io.TextIOWrapper(io.BytesIO(raw)).read(), [])
+        _save_cache(cache_path, dataset, args.filename_dataset, stat,
+                    hashlib.blake2b(raw).hexdigest())
+        return select_features(dataset, feature_list)
+    except (FileExistsError, FileNotFoundError, csv.Error):
+        data = sys.exc_info()[1]
+        if data is not None:
+            error_message(f'file {args.filename_dataset}: {data.args[-1]}')
+        sys.exit(1)
+    except (StopIteration, ValueError):
+        error_message(f'file {args.filename_dataset}: wrong format of the data set')
+        sys.exit(1)
@@ -7,20 +7,26 @@ about numerical features of dataset
 
   args = options_parse()
   dict_num_features = set_numerical_features(features, dataset, logger)
+  table, rank_error = get_stats_table(args, logger)
   describe_vertical(args, logger)
   describe_horizontal(args, logger)
 """
 
+import sys
 import argparse
 from exceptions import NoDataException
-from typing import List
+from typing import Callable, List, Tuple, Optional
 from logging import Logger
 import numpy as np  # type: ignore
-from stream_funcs import error_message
-from csv_utils import load_csv
+from stream_funcs import error_message, normal_message
+from csv_utils import TypedDataset, DEFAULT_BLOCK_SIZE, iter_csv_blocks
+from dataset_cache import load_csv_cached
 from fmath import count_, mean_, std_, min_, max_, percentile_25_, percentile_50_, \
     percentile_75_
 from app_logger import get_logger
+from describe_engine import StatsTable, describe_matrix_parallel, describe_groups
+from summary import StreamSummary
+from describe_state import load_state, save_state
 
 
 FUNCTION_LIST = {'Count': count_,
@@ -38,10 +44,15 @@ def options_parse() -> argparse.Namespace:
     The function extracts arguments of command line and
     returns them as parameters of the program.
     A validation is performing in argparse library module.
-    The function processes 4 parameters:
+    The function processes 9 parameters:
         - 'filename_dataset': name of file with data
         - printing mode
         - whether to get 'index' filed as a feature
+        - stream mode: to read data by blocks with approximate percentiles
+        - a number of rows in a block for stream mode
+        - a directory for a state of incremental describe
+        - a name of column to group rows
+        - a number of worker processes
         - a log file name: to specify file name for logger, default = 'log.txt'
 
     Returns:
@@ -62,6 +73,39 @@ def options_parse() -> argparse.Namespace:
                         action="store_true",
                         dest="index",
                         help="To include index column from features")
+    parser.add_argument("--stream",
+                        "-s",
+                        action="store_true",
+                        dest="stream",
+                        help="To read data by blocks in bounded memory, percentiles are "
+                             "approximate")
+    parser.add_argument("--block_size",
+                        "-b",
+                        action="store",
+                        dest="block_size",
+                        type=int,
+                        help="A number of rows in a block for stream mode, "
+                             f"{DEFAULT_BLOCK_SIZE} by default")
+    parser.add_argument("--state",
+                        action="store",
+                        dest="state",
+                        help="A directory for a state of incremental describe: only rows "
+                             "appended after the previous run are read, percentiles "
+                             "are approximate")
+    parser.add_argument("--by",
+                        action="store",
+                        dest="by",
+                        help="A name of string column to calculate statistics for each "
+                             "group of rows, e.g. 'Hogwarts House' (exact percentiles, "
+                             "it is not combined with stream mode and a state)")
+    parser.add_argument("--jobs",
+                        "-j",
+                        action="store",
+                        dest="jobs",
+                        type=int,
+                        default=1,
+                        help="A number of worker processes to calculate statistics of columns "
+                             "(exact statistics only, not with stream mode and a state)")
     parser.add_argument("--log_file_name",
                         "-f",
                         action="store",
@@ -75,6 +119,7 @@ def set_numerical_features(features: List[str], dataset: np.array, logger: Logge
     """
     The function gets a list of name of features, analyses data for each feature
     and marks each feature as numeric or not.
+    A float matrix is analysed for all features at once.
 
     Args:
         features: a list of name of features
@@ -88,13 +133,13 @@ def set_numerical_features(features: List[str], dataset: np.array, logger: Logge
     if logger is not None:
         logger.debug("Getting of list of numerical feature")
     numerical_features = dict.fromkeys(features, True)
+    try:
+        data = np.asarray(dataset, dtype=float).reshape(len(dataset), len(features))
+        has_data = ((data != 0) & ~np.isnan(data)).any(axis=0)
+    except (ValueError, TypeError):
+        has_data = [_has_numerical_data(dataset[:, idx]) for idx, _ in enumerate(features)]
     for idx, feature in enumerate(features):
-        try:
-            data = np.array(dataset[:, idx], dtype=float)
-            data = data[~np.isnan(data)]
-            if not data.any():
-                raise NoDataException("No numerical data in column " + feature)
-        except (ValueError, TypeError, NoDataException):
+        if not has_data[idx]:
             if logger is not None:
                 logger.error("No numerical data in column " + feature)
             numerical_features[feature] = False
@@ -104,83 +149,294 @@ def set_numerical_features(features: List[str], dataset: np.array, logger: Logge
     return numerical_features
 
 
-def describe_vertical(args: argparse.Namespace, logger: Logger) -> None:
+def _has_numerical_data(column: np.array) -> bool:
     """
-    The function gets filename as a parameter, prints results for each feature in rows
-    Options: logging of process
+    The function checks whether a column of a data set contains numerical data
+
+    Args:
+        column: a column of a data set
+
+    Returns:
+        True if the column is numerical and it is not empty
+    """
+    try:
+        data = np.array(column, dtype=float)
+        data = data[~np.isnan(data)]
+        if not data.any():
+            raise NoDataException("No numerical data in column")
+    except (ValueError, TypeError, NoDataException):
+        return False
+    return True
+
+
+def get_numerical_columns(typed_dataset: TypedDataset, index: bool) -> \
+        Tuple[List[str], np.array]:
+    """
+    The function returns numerical columns of a typed data set.
+    The index column is included as the first column if 'index' option is set.
+
+    Args:
+        typed_dataset: a typed data set
+        index: whether to include index column
+
+    Returns:
+        - a list of names of features
+        - values of features as a float matrix
+    """
+    if not index:
+        return typed_dataset.feature_names, typed_dataset.features
+    return [typed_dataset.header[0]] + typed_dataset.feature_names, \
+        np.column_stack((typed_dataset.index, typed_dataset.features))
+
+
+def get_numerical_data(args: argparse.Namespace, logger: Logger) -> Tuple[List[str], np.array]:
+    """
+    The function loads data set as typed columns and returns numerical columns only.
+    The index column is included as the first column if 'index' option is set.
 
     Args:
         args: a list of the program parameters as argparse.Namespace object
         logger: object for logging a script
+
+    Returns:
+        - a list of names of features
+        - values of features as a float matrix
     """
-    logger.info("Printing mode is vertical: printing of metrics in rows")
-    dataset = load_csv(args)
     if not args.index:
-        dataset = np.delete(dataset, 0, axis=1)
         logger.debug("Column index is deleted")
-    features = dataset[0]
-    dataset = dataset[1:]
+    return get_numerical_columns(load_csv_cached(args), args.index)
+
+
+def get_stream_summary(args: argparse.Namespace, logger: Logger) -> StreamSummary:
+    """
+    The function reads data set by blocks and calculates mergeable statistics
+    of numerical columns in bounded memory.
+    If a state directory is defined then the summary of the previous run is loaded,
+    only appended rows are read, and the updated summary is saved to the state.
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        logger: object for logging a script
+
+    Returns:
+        A summary of numerical columns
+    """
+    summary: Optional[StreamSummary] = None
+    offset = 0
+    if args.state is not None:
+        summary, offset = load_state(args.state, args.filename_dataset, args.index)
+        logger.info("State is loaded: reading from byte " + str(offset) if summary is not None
+                    else "State is absent or out of date: reading from the beginning")
+    blocks = iter_csv_blocks(args, block_size=args.block_size or DEFAULT_BLOCK_SIZE,
+                             offset=offset, complete_rows=args.state is not None)
+    for idx, (block, offset) in enumerate(blocks):
+        features, data = get_numerical_columns(block, args.index)
+        if summary is None:
+            summary = StreamSummary(features)
+        summary.update(data)
+        logger.debug(f"Block {idx}: {len(data)} rows: OK")
+    if summary is None:
+        summary = StreamSummary([])
+    if args.state is not None:
+        save_state(args.state, args.filename_dataset, args.index, summary, offset)
+        logger.info("State is saved")
+    return summary
+
+
+def get_stats_table(args: argparse.Namespace, logger: Logger) -> \
+        Tuple[StatsTable, Optional[float]]:
+    """
+    The function loads data set and calculates all statistics of FUNCTION_LIST
+    for numerical features: by the describe engine or by the stream summary
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        logger: object for logging a script
+
+    Returns:
+        - a table of statistics
+        - a bound of rank error of percentiles for stream mode, None for exact percentiles
+    """
+    logger.debug("Calculation of statistics of numerical features")
+    if args.stream or args.state is not None:
+        if args.jobs > 1:
+            message = 'Option --jobs is not combined with --stream and --state'
+            logger.error(message)
+            error_message(message)
+            sys.exit(1)
+        summary = get_stream_summary(args, logger)
+        columns = [idx for idx, value in enumerate(summary.numerical()) if value]
+        for idx, feature in enumerate(summary.features):
+            if idx not in columns:
+                logger.error("No numerical data in column " + feature)
+        summary = summary.select(columns)
+        logger.debug("OK")
+        return summary.table(list(FUNCTION_LIST)), float(max(summary.rank_error(), default=0))
+    features, dataset = get_numerical_data(args, logger)
+    numerical_features = set_numerical_features(features, dataset, logger)
+    columns = [idx for idx, feature in enumerate(features) if numerical_features[feature]]
+    table = describe_matrix_parallel([features[idx] for idx in columns],
+                                     dataset[:, columns], list(FUNCTION_LIST), args.jobs)
+    logger.debug("OK")
+    return table, None
+
+
+def get_group_tables(args: argparse.Namespace, logger: Logger) -> List[Tuple[str, StatsTable]]:
+    """
+    The function loads data set and calculates all statistics of FUNCTION_LIST
+    for numerical features in each group of rows defined by the string column 'by'
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        logger: object for logging a script
+
+    Returns:
+        A list of pairs: a value of the column 'by' and a table of statistics of the group
+
+    Raises:
+        NoDataException: the column 'by' is not a string column of the data set
+    """
+    typed_dataset = load_csv_cached(args)
+    if args.by not in typed_dataset.codes:
+        raise NoDataException("No string column " + args.by)
+    features, dataset = get_numerical_columns(typed_dataset, args.index)
     numerical_features = set_numerical_features(features, dataset, logger)
+    columns = [idx for idx, feature in enumerate(features) if numerical_features[feature]]
+    categories = typed_dataset.categories[args.by]
+    logger.debug("Calculation of statistics of numerical features by " + args.by)
+    tables = describe_groups([features[idx] for idx in columns], dataset[:, columns],
+                             typed_dataset.codes[args.by], len(categories),
+                             list(FUNCTION_LIST), args.jobs)
+    logger.debug("OK")
+    return list(zip(categories, tables))
+
+
+def describe_by_group(args: argparse.Namespace, logger: Logger,
+                      print_table: Callable[[StatsTable, Logger], None]) -> None:
+    """
+    The function prints tables of statistics for each group of rows
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        logger: object for logging a script
+        print_table: a function to print a table in a print mode
+    """
+    options = [name for name, value in [('--stream', args.stream), ('--state', args.state),
+                                        ('--block_size', args.block_size)]
+               if value]
+    if options:
+        message = 'Option --by is not combined with ' + ', '.join(options)
+        logger.error(message)
+        error_message(message)
+        sys.exit(1)
+    try:
+        groups = get_group_tables(args, logger)
+    except NoDataException as exception:
+        logger.error(exception.message)
+        error_message(exception.message)
+        sys.exit(1)
+    for idx, (name, table) in enumerate(groups):
+        if idx:
+            print()
+        print(f'{args.by}: {name}')
+        print_table(table, logger)
+
+
+def print_rank_error(rank_error: Optional[float]) -> None:
+    """
+    The function prints a bound of rank error of approximate percentiles
+
+    Args:
+        rank_error: a bound of rank error as a fraction, None for exact percentiles
+    """
+    if rank_error is not None:
+        normal_message(f'Percentiles are approximate: rank error is less than '
+                       f'{rank_error:.4%} with probability 99%')
+
+
+def print_vertical(table: StatsTable, logger: Logger) -> None:
+    """
+    The function prints a table of statistics: results for each feature in rows
+
+    Args:
+        table: a table of statistics
+        logger: object for logging a script
+    """
     print(f'{"":15}', end='')
     logger.debug("Printing of table title: names of numerical features")
-    for feature in features:
-        if numerical_features[feature]:
-            print(f' |{feature:12.12}', end='')
+    for feature in table.features:
+        print(f' |{feature:12.12}', end='')
     print()
     logger.debug("OK")
 
     logger.debug("Printing of table: values of numerical features")
-    for function in FUNCTION_LIST:
+    for row, function in enumerate(table.functions):
         print(f'{function:15}', end='')
-        logger.debug("Printing of table: function " + function)
-        for idx, feature in enumerate(features):
-            if numerical_features[feature]:
-                data = np.array(dataset[:, idx], dtype=float)
-                data = data[~np.isnan(data)]
-                print(f' |{FUNCTION_LIST[function](data):>12.4f}', end='')
-                logger.debug(feature + ": OK")
+        for value in table.values[row]:
+            print(f' |{value:>12.4f}', end='')
         print()
         logger.debug("Printing of table: function " + function + ": OK")
     logger.debug("Printing of table: values of numerical features: OK")
 
 
-def describe_horizontal(args: argparse.Namespace, logger: Logger) -> None:
+def print_horizontal(table: StatsTable, logger: Logger) -> None:
     """
-    The function gets filename as a parameter, prints results for each feature in columns
-    Options: logging of process
+    The function prints a table of statistics: results for each feature in columns
 
     Args:
-        args: a list of the program parameters as argparse.Namespace object
+        table: a table of statistics
         logger: object for logging a script
     """
-    logger.info("Printing mode is horizontal: printing of metrics in columns")
-    dataset = load_csv(args)
-    if not args.index:
-        dataset = np.delete(dataset, 0, axis=1)
-        logger.debug("Column index is deleted")
-    features = dataset[0]
-    dataset = dataset[1:]
     logger.debug("Printing of table title: names of functions")
-    print(f'{"":15} |{"Count":>12} |{"Mean":>12} |{"Std":>12} |{"Min":>12} |{"25%":>12} |'
-          f'{"50%":>12} |{"75%":>12} |'f'{"Max":>12}')
+    print(f'{"":15}' + ''.join(f' |{function:>12}' for function in table.functions))
     logger.debug("OK")
 
-    numerical_features = set_numerical_features(features, dataset, logger)
     logger.debug("Printing of table: values of numerical features")
-    for idx, feature in enumerate(features):
-        if not numerical_features[feature]:
-            continue
-        logger.debug("Printing of table: feature " + feature)
+    for col, feature in enumerate(table.features):
         print(f'{feature:15.15}', end=' |')
-        data = np.array(dataset[:, idx], dtype=float)
-        data = data[~np.isnan(data)]
-        for function in FUNCTION_LIST:
-            print(f' {FUNCTION_LIST[function](data):>12.4f}|', end='')
+        for value in table.values[:, col]:
+            print(f' {value:>12.4f}|', end='')
         print()
         logger.debug("Printing of table: feature " + feature + ": OK")
     logger.debug("Printing of table: values of numerical features: OK")
 
 
+def describe_vertical(args: argparse.Namespace, logger: Logger) -> None:
+    """
+    The function gets filename as a parameter, prints results for each feature in rows
+    Options: logging of process
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        logger: object for logging a script
+    """
+    logger.info("Printing mode is vertical: printing of metrics in rows")
+    if args.by is not None:
+        describe_by_group(args, logger, print_vertical)
+        return
+    table, rank_error = get_stats_table(args, logger)
+    print_vertical(table, logger)
+    print_rank_error(rank_error)
+
+
+def describe_horizontal(args: argparse.Namespace, logger: Logger) -> None:
+    """
+    The function gets filename as a parameter, prints results for each feature in columns
+    Options: logging of process
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        logger: object for logging a script
+    """
+    logger.info("Printing mode is horizontal: printing of metrics in columns")
+    if args.by is not None:
+        describe_by_group(args, logger, print_horizontal)
+        return
+    table, rank_error = get_stats_table(args, logger)
+    print_horizontal(table, logger)
+    print_rank_error(rank_error)
+
+
 def do_main_function() -> None:
     """
     Main function of DESCRIBE script
@@ -0,0 +1,211 @@
+"""
+The module contains the describe engine: it calculates statistics of all numerical
+columns of a data set at once. Count, mean, std are calculated in one pass over
+the matrix by blocks of rows (fmath.moments_); min, max and all requested percentiles
+are calculated by a single selection (NUMPY partition) of the matrix.
+The matrix is processed in Fortran order, so statistics of a column do not depend on
+other columns, and columns can be split between worker processes with the same result.
+The result is a table which is rendered by DESCRIBE script in any print mode.
+
+  Typical usage example:
+
+  table = describe_matrix(features, data, ['Count', 'Mean', 'Std', 'Min', '25%', 'Max'])
+  table = describe_matrix_parallel(features, data, functions, jobs=4)
+  tables = describe_groups(features, data, codes, len(categories), functions)
+  value = table.values[table.functions.index('Mean'), table.features.index('Flying')]
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np  # type: ignore
+from fmath import moments_, select_, split_points
+from parallel_utils import ArrayDescriptor, SharedArray, attach_array, run_in_pool
+
+STATISTICS = ['Count', 'Mean', 'Std', 'Min', 'Max']
+
+
+class StatsTable(NamedTuple):
+    """
+    StatsTable is a result of the describe engine
+
+    Attributes:
+        features: a list of names of features (columns of the table)
+        functions: a list of names of statistics (rows of the table)
+        values: a float matrix of values: statistics in rows, features in columns
+    """
+    features: List[str]
+    functions: List[str]
+    values: np.array
+
+
+def get_percentage(function: str) -> Optional[float]:
+    """
+    The function returns a percentage for a name of percentile statistic like '25%'
+
+    Args:
+        function: a name of statistic
+
+    Returns:
+        A percentage as a float number or None if the statistic is not a percentile
+    """
+    if not function.endswith('%'):
+        return None
+    try:
+        return float(function[:-1])
+    except ValueError:
+        return None
+
+
+def check_functions(functions: List[str]) -> None:
+    """
+    The function checks that the engine is able to calculate all statistics
+
+    Args:
+        functions: a list of names of statistics
+
+    Raises:
+        ValueError: there is an unknown statistic in the list
+    """
+    for function in functions:
+        if function not in STATISTICS and get_percentage(function) is None:
+            raise ValueError('Unknown statistic ' + function)
+
+
+def describe_matrix(features: List[str], data: np.array, functions: List[str]) -> StatsTable:
+    """
+    The function calculates statistics for all columns of a float matrix.
+    Nan values are skipped. Percentiles are calculated as in fmath.percentile_ function.
+
+    Args:
+        features: a list of names of columns
+        data: a float matrix: rows are observations, columns are features
+        functions: a list of names of statistics: 'Count', 'Mean', 'Std', 'Min', 'Max'
+          and percentiles like '25%'
+
+    Returns:
+        A table of statistics
+    """
+    check_functions(functions)
+    data = np.asfortranarray(data, dtype=np.float64).reshape((len(data), len(features)),
+                                                              order='F')
+    counts, mean, std = moments_(data)
+
+    percentages = [get_percentage(function) for function in functions]
+    points = np.vstack((np.zeros((1, len(features)), dtype=np.int64),
+                        split_points(counts, [item for item in percentages if item is not None]),
+                        (counts - 1).reshape(1, -1)))
+    selected = select_(data, points)
+
+    values = np.empty((len(functions), len(features)), dtype=np.float64)
+    position = 1
+    for row, function in enumerate(functions):
+        if percentages[row] is not None:
+            values[row] = selected[position]
+            position += 1
+        else:
+            values[row] = {'Count': counts, 'Mean': mean, 'Std': std,
+                           'Min': selected[0], 'Max': selected[-1]}[function]
+    return StatsTable(features=list(features), functions=list(functions), values=values)
+
+
+def _describe_task(task: Tuple[ArrayDescriptor, Tuple[int, int], Tuple[int, int], List[str],
+                               List[str]]) -> np.array:
+    """
+    The function is a task of a worker process: it calculates statistics
+    for a range of columns of a range of rows of a matrix in shared memory
+
+    Args:
+        task: a descriptor of the matrix, a range of rows, a range of columns,
+          names of the columns, a list of names of statistics
+
+    Returns:
+        Values of statistics for the columns
+    """
+    descriptor, (top, bottom), (first, last), features, functions = task
+    shm, data = attach_array(descriptor)
+    try:
+        return describe_matrix(features, data[top:bottom, first:last], functions).values
+    finally:
+        del data
+        shm.close()
+
+
+def _column_bounds(columns: int, jobs: int) -> List[Tuple[int, int]]:
+    """
+    The function splits columns of a matrix into ranges for worker processes
+
+    Args:
+        columns: a quantity of columns
+        jobs: a number of worker processes
+
+    Returns:
+        A list of ranges of columns
+    """
+    bounds = np.linspace(0, columns, max(1, min(jobs, columns)) + 1).astype(int)
+    return [(int(first), int(last)) for first, last in zip(bounds[:-1], bounds[1:])]
+
+
+def describe_matrix_parallel(features: List[str], data: np.array, functions: List[str],
+                             jobs: int) -> StatsTable:
+    """
+    The function calculates statistics for all columns of a float matrix as describe_matrix
+    function does, but columns are split between worker processes.
+    The matrix is copied once to shared memory, workers do not receive copies of data.
+    The result is the same as the result of describe_matrix function.
+
+    Args:
+        features: a list of names of columns
+        data: a float matrix: rows are observations, columns are features
+        functions: a list of names of statistics
+        jobs: a number of worker processes
+
+    Returns:
+        A table of statistics
+    """
+    check_functions(functions)
+    if jobs <= 1 or len(features) <= 1:
+        return describe_matrix(features, data, functions)
+    with SharedArray(np.asarray(data, dtype=np.float64), order='F') as shared:
+        tasks = [(shared.descriptor, (0, len(data)), (first, last), list(features[first:last]),
+                  list(functions))
+                 for first, last in _column_bounds(len(features), jobs)]
+        parts = run_in_pool(_describe_task, tasks, jobs)
+    return StatsTable(features=list(features), functions=list(functions), values=np.hstack(parts))
+
+
+def describe_groups(features: List[str], data: np.array, codes: np.array, groups: int,
+                    functions: List[str], jobs: int = 1) -> List[StatsTable]:
+    """
+    The function calculates statistics for all columns of a float matrix in each group of rows.
+    Rows are ordered by codes of groups by a single stable sort, so each group is
+    a contiguous slice of the ordered matrix; there are no masks of groups over the matrix.
+    With several worker processes the ordered matrix is copied once to shared memory and
+    a single pool calculates ranges of columns of all groups.
+
+    Args:
+        features: a list of names of columns
+        data: a float matrix: rows are observations, columns are features
+        codes: codes of groups of rows: integers from 0 to a quantity of groups - 1
+        groups: a quantity of groups
+        functions: a list of names of statistics
+        jobs: a number of worker processes
+
+    Returns:
+        A list of tables of statistics: a table for each code of group
+    """
+    codes = np.asarray(codes).reshape(-1)
+    order = np.argsort(codes, kind='stable')
+    ordered = np.asarray(data, dtype=np.float64)[order]
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=groups))))
+    if jobs <= 1:
+        return [describe_matrix(features, ordered[bounds[code]:bounds[code + 1]], functions)
+                for code in range(groups)]
+    check_functions(functions)
+    columns = _column_bounds(len(features), jobs)
+    with SharedArray(ordered, order='F') as shared:
+        tasks = [(shared.descriptor, (int(bounds[code]), int(bounds[code + 1])), (first, last),
+                  list(features[first:last]), list(functions))
+                 for code in range(groups) for first, last in columns]
+        parts = run_in_pool(_describe_task, tasks, jobs)
+    return [StatsTable(features=list(features), functions=list(functions),
+                       values=np.hstack(parts[code * len(columns):(code + 1) * len(columns)]))
+            for code in range(groups)]
@@ -0,0 +1,90 @@
+"""
+The module contains functions to save and to load a state of incremental DESCRIBE:
+a mergeable summary of numerical columns of a data set and a byte offset of the end
+of rows which are already included in the summary.
+A state is valid while the data set is only appended: the header, the size and
+the bytes just before the offset are checked before the state is used.
+
+  Typical usage example:
+
+  summary, offset = load_state(state_path, filename, index)
+  save_state(state_path, filename, index, summary, offset)
+"""
+
+import os
+import hashlib
+from typing import Optional, Tuple
+from summary import StreamSummary
+from npy_store import save_arrays, load_arrays
+
+STATE_VERSION = 1
+CHECK_SIZE = 4096
+
+
+def _check_hash(filename: str, offset: int) -> str:
+    """
+    The function calculates a hash of the first line of a file and
+    of bytes just before the offset
+
+    Args:
+        filename: a name of file
+        offset: a byte offset
+
+    Returns:
+        A hash as a hex string
+    """
+    digest = hashlib.blake2b()
+    with open(filename, 'rb') as data_file:
+        digest.update(data_file.readline())
+        start = max(0, offset - CHECK_SIZE)
+        data_file.seek(start)
+        digest.update(data_file.read(offset - start))
+    return digest.hexdigest()
+
+
+def load_state(path: str, filename: str, index: bool) -> Tuple[Optional[StreamSummary], int]:
+    """
+    The function loads a state of incremental DESCRIBE for a data set.
+    If the state is absent, damaged or it does not correspond to the data set
+    then there is no summary and reading has to be started from the beginning.
+
+    Args:
+        path: a name of the state directory
+        filename: a name of csv file with the data set
+        index: whether the index column is included in the summary
+
+    Returns:
+        - a summary or None
+        - a byte offset to continue reading of the data set, 0 to read from the beginning
+    """
+    try:
+        arrays, header = load_arrays(path, mmap_mode=None)
+        offset = header['offset']
+        if header.get('version') != STATE_VERSION or header['index'] != index or \
+                header['path'] != os.path.abspath(filename) or \
+                os.path.getsize(filename) < offset or \
+                header['hash'] != _check_hash(filename, offset):
+            return None, 0
+        return StreamSummary.from_arrays(header['features'], arrays), offset
+    except (OSError, ValueError, KeyError):
+        return None, 0
+
+
+def save_state(path: str, filename: str, index: bool, summary: StreamSummary,
+               offset: int) -> None:
+    """
+    The function saves a state of incremental DESCRIBE for a data set
+
+    Args:
+        path: a name of the state directory
+        filename: a name of csv file with the data set
+        index: whether the index column is included in the summary
+        summary: a summary of numerical columns
+        offset: a byte offset of the end of rows which are included in the summary
+    """
+    save_arrays(path, summary.to_arrays(), {'version': STATE_VERSION,
+                                            'path': os.path.abspath(filename),
+                                            'index': index,
+                                            'features': summary.features,
+                                            'offset': offset,
+                                            'hash': _check_hash(filename, offset)})
@@ -15,3 +15,19 @@ class NoDataException(Exception):
         """Initializes NoDataException class with initial values"""
         super().__init__()
         self.message = message
+
+
+class RequestException(Exception):
+    """
+    RequestException class throws an exception if a request to the service is wrong
+
+    Attributes:
+        status: a HTTP status code of the response
+        message: a message of the exception
+    """
+
+    def __init__(self, status: int, message: str) -> None:
+        """Initializes RequestException class with initial values"""
+        super().__init__()
+        self.status = status
+        self.message = message
@@ -1,5 +1,8 @@
 """
-The module contains functions for calculating of the characteristics of arrays
+The module contains functions for calculating of the characteristics of arrays.
+All functions skip nan values and are calculated by NUMPY reductions.
+Functions accept an axis parameter: for a 2-D matrix and axis=0 characteristics of
+all columns are calculated in one call.
 
   Typical usage examples:
 
@@ -12,152 +15,266 @@ The module contains functions for calculating of the characteristics of arrays
   percentile50_value = percentile_50(array)
   percentile75_value = percentile_75(array)
   percentile_value = percentile_(array, percentage)
+  percentile_values = percentiles_(matrix, [25, 50, 75], axis=0)
+  counts, means, stds = moments_(matrix)
+  values = select_(matrix, positions)
 """
 
+from typing import Optional, Sequence, Tuple
 import numpy as np  # type: ignore
 
+MAX_PARTITION_POINTS = 64
+MOMENT_BLOCK_ROWS = 4096
 
-def count_(data: np.array) -> int:
+
+def count_(data: np.array, axis: Optional[int] = None) -> int:
     """
     The function counts quantity of not nan items in the array.
 
     Args:
         data: array
+        axis: an axis to count along, None to count in the entire array
 
     Returns:
         Quantity of items in the array as an integer number
     """
     try:
-        data = data[~np.isnan(data)]
-        data = data.astype('float64')
-        return len(data)
+        return np.count_nonzero(~np.isnan(data), axis=axis)
     except TypeError:
         return len(data)
 
 
-def mean_(data: np.array) -> np.float64:
+def mean_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function counts mean value of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Mean value of items in the array as a float number
     """
-    total = 0.0
-    for item in data:
-        if np.isnan(item):
-            continue
-        total = total + item
-    return total / len(data)
+    data = np.asarray(data, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nansum(data, axis=axis) / count_(data, axis)
 
 
-def std_(data: np.array) -> np.float64:
+def std_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function counts standard deviation of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Standard deviation of items in the array as a float number
     """
-    mean = mean_(data)
-    total = 0.0
-    for item in data:
-        if np.isnan(item):
-            continue
-        total = total + (item - mean) ** 2
-    return (total / len(data)) ** 0.5
+    data = np.asarray(data, dtype=np.float64)
+    mean = mean_(data, axis)
+    deviation = data - (mean if axis is None else np.expand_dims(mean, axis))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sqrt(np.nansum(deviation * deviation, axis=axis) / count_(data, axis))
 
 
-def min_(data: np.array) -> np.float64:
+def moments_(data: np.array, block_rows: int = MOMENT_BLOCK_ROWS) -> \
+        Tuple[np.array, np.array, np.array]:
+    """
+    The function counts quantities, means and standard deviations of not nan items
+    of all columns of a matrix in one pass over the matrix by blocks of rows.
+    A block is centered in a preallocated buffer while it is in cache, moments of blocks
+    are merged as in the parallel algorithm of Chan et al., so there are no copies
+    of the entire matrix.
+
+    Args:
+        data: a float matrix, columns are arrays
+        block_rows: a number of rows in a block
+
+    Returns:
+        Quantities, means and standard deviations of columns
+    """
+    data = np.asarray(data, dtype=np.float64)
+    counts = np.zeros(data.shape[1], dtype=np.int64)
+    sums = np.zeros(data.shape[1], dtype=np.float64)
+    mean = np.zeros(data.shape[1], dtype=np.float64)
+    m2 = np.zeros(data.shape[1], dtype=np.float64)
+    buffer = np.empty((min(block_rows, len(data)), data.shape[1]), dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for first in range(0, len(data), block_rows):
+            block = data[first:first + block_rows]
+            deviation = buffer[:len(block)]
+            count = count_(block, 0)
+            block_sum = np.nansum(block, axis=0)
+            block_mean = block_sum / count
+            np.subtract(block, block_mean, out=deviation)
+            np.multiply(deviation, deviation, out=deviation)
+            block_m2 = np.nansum(deviation, axis=0)
+            total = counts + count
+            delta = block_mean - mean
+            m2 = np.where(count > 0, m2 + block_m2 + delta * delta * counts * count / total, m2)
+            mean = np.where(count > 0, mean + delta * count / total, mean)
+            counts, sums = total, sums + block_sum
+        return counts, sums / counts, np.sqrt(m2 / counts)
+
+
+def min_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function defines min value of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Min value of items in the array as a float number
     """
-    min_value = data[0]
-    for item in data:
-        val = item
-        if val < min_value:
-            min_value = val
-    return min_value
+    data = np.asarray(data, dtype=np.float64)
+    if data.size == 0:
+        return np.float64(np.nan)
+    return np.fmin.reduce(data, axis=axis)
 
 
-def max_(data: np.array) -> np.float64:
+def max_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function defines max value of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Max value of items in the array as a float number
     """
-    min_value = data[0]
-    for item in data:
-        val = item
-        if val > min_value:
-            min_value = val
-    return min_value
+    data = np.asarray(data, dtype=np.float64)
+    if data.size == 0:
+        return np.float64(np.nan)
+    return np.fmax.reduce(data, axis=axis)
 
 
-def percentile_25_(data: np.array) -> np.float64:
+def percentile_25_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function calculates percentile 25% of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Value of percentile 25% of items in the array as a float number
     """
-    return percentile_(data, 25)
+    return percentile_(data, 25, axis)
 
 
-def percentile_50_(data: np.array) -> np.float64:
+def percentile_50_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function calculates percentile 50% of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Value of percentile 50% of items in the array as a float number
     """
-    return percentile_(data, 50.0)
+    return percentile_(data, 50.0, axis)
 
 
-def percentile_75_(data: np.array) -> np.float64:
+def percentile_75_(data: np.array, axis: Optional[int] = None) -> np.float64:
     """
     The function calculates percentile 75% of not nan items in the array of numbers.
 
     Args:
         data: array
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Value of percentile 75% of items in the array as a float number
     """
-    return percentile_(data, 75.0)
+    return percentile_(data, 75.0, axis)
 
 
-def percentile_(data: np.array, percentage: np.float64) -> np.float64:
+def percentile_(data: np.array, percentage: np.float64,
+                axis: Optional[int] = None) -> np.float64:
     """
     The function calculates percentile of not nan items in the array of numbers.
+    The array is not changed.
 
     Args:
         data: array
         percentage: float value
+        axis: an axis to calculate along, None to calculate for the entire array
 
     Returns:
         Value of defined percentile of items in the array as a float number
     """
-    data.sort()
-    split_point = int(round(len(data) * percentage / 100 + 0.5))
-    return data[split_point - 1]
+    return percentiles_(data, [percentage], axis)[0]
+
+
+def split_points(counts: np.array, percentages: Sequence[np.float64]) -> np.array:
+    """
+    The function calculates positions of percentiles in sorted arrays:
+    the position is round(count * percentage / 100 + 0.5) - 1, the rounding is half to even.
+
+    Args:
+        counts: quantities of not nan items in arrays
+        percentages: a sequence of float values
+
+    Returns:
+        Positions as an integer array: percentages along the first axis
+    """
+    counts = np.asarray(counts)
+    points = [np.round(counts * percentage / 100 + 0.5).astype(np.int64) - 1
+              for percentage in percentages]
+    return np.array(points, dtype=np.int64).reshape((len(percentages),) + counts.shape)
+
+
+def percentiles_(data: np.array, percentages: Sequence[np.float64],
+                 axis: Optional[int] = None) -> np.array:
+    """
+    The function calculates several percentiles of not nan items in the array of numbers
+    by a single selection: NUMPY partition for all positions at once.
+    If there are too many different positions the array is sorted instead.
+    The array is not changed.
+
+    Args:
+        data: array
+        percentages: a sequence of float values
+        axis: an axis to calculate along, None to calculate for the entire array
+
+    Returns:
+        Values of percentiles: percentages along the first axis
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if axis is None:
+        data = data.reshape(-1)
+        axis = 0
+    data = np.moveaxis(data, axis, 0)
+    return select_(data, split_points(count_(data, 0), percentages))
+
+
+def select_(data: np.array, points: np.array) -> np.array:
+    """
+    The function selects items which are placed on defined positions in sorted arrays
+    by a single NUMPY partition for all positions at once, nan values are placed at the end.
+    If there are too many different positions the array is sorted instead.
+    The array is not changed.
+
+    Args:
+        data: array, arrays are along the first axis
+        points: positions in sorted arrays, the first axis is for positions
+
+    Returns:
+        Selected values, nan for positions out of quantity of not nan items
+    """
+    counts = count_(data, 0)
+    valid = (points >= 0) & (points < np.expand_dims(counts, 0))
+    points = np.where(valid, points, 0)
+    if not data.shape[0]:
+        return np.full(points.shape, np.nan)
+    kth = np.unique(points)
+    if len(kth) > MAX_PARTITION_POINTS:
+        selected = np.sort(data, axis=0)
+    else:
+        selected = np.partition(data, kth, axis=0)
+    return np.where(valid, np.take_along_axis(selected, points, axis=0), np.nan)
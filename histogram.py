@@ -13,8 +13,8 @@ The module contains functions for HISTOGRAM script:
 from typing import List
 import numpy as np  # type: ignore
 import matplotlib.pyplot as plt  # type: ignore
-from data_utils import preprocessing, get_house_data
-from csv_utils import load_csv
+from data_utils import preprocessing_typed, get_house_data
+from dataset_cache import load_csv_cached
 from arg_utils import options_parse_fa
 
 
@@ -54,7 +54,7 @@ def calc_and_plot(houses: List[str], features: List[str], house_data: List[np.ar
     """
     data_col = []
     for idx_house, _ in enumerate(houses):
-        data_col.append(np.array(house_data[idx_house][:, idx], dtype=float))
+        data_col.append(house_data[idx_house][:, idx])
     plot_histogram(data_col, legend=houses, title=features[idx], x_label='Marks',
                    y_label='A number of students')
 
@@ -66,15 +66,15 @@ def do_main_function() -> None:
     defines the course with the most homogeneous score.
     """
     args = options_parse_fa()
-    dataset = load_csv(args)
-    houses, features, data = preprocessing(dataset)
+    dataset = load_csv_cached(args)
+    houses, features, data = preprocessing_typed(dataset)
     house_data = get_house_data(data, houses)
 
     min_mark_range = np.inf
     idx_homogeneous_feature = 0
 
     for idx in range(1, len(features)):
-        mark_line = np.array(data[:, idx], dtype=float)
+        mark_line = data[:, idx]
         if (max(mark_line) - min(mark_line)) < min_mark_range:
             min_mark_range = max(mark_line) - min(mark_line)
             idx_homogeneous_feature = idx
@@ -1,15 +1,181 @@
 """
 The module contains MyLogisticRegressionClass (the model) with methods.
 The object of the class is initialized by parameters: a thetas array, an alpha step and
-quantity of iterations for gradient descent.
+quantity of iterations for gradient descent, an update rule of gradient descent
+(plain steps, momentum, Adam or backtracking control of the step size).
+The model computes in float64 or in float32: the design matrix, thetas and all buffers
+of training have the same dtype.
 The object of the is in fact the model of logistic regression which uses sigmoid function
 to calculate an error on the each step and to move on gradient.
+The model works on a design matrix: a float matrix with the bias column and scaled features.
+The design matrix can be backed by a memory-mapped file, so training and prediction
+run on it in place.
+There are 5 solvers: 'gd' is full-batch gradient descent, 'minibatch' and 'sgd' are
+(mini-batch) stochastic gradient descent over epochs; stochastic solvers can train
+on blocks of rows which are read one by one (see fit_blocks method).
+'newton' (IRLS) and 'lbfgs' are second-order and quasi-Newton solvers of optimizers module.
+There are 3 modes of training:
+    - 'ovr': one-vs-rest classifiers are trained one by one
+    - 'stacked': thetas of all one-vs-rest classifiers are columns of a matrix,
+      all classifiers are updated by a single matrix product on each iteration
+    - 'softmax': the multinomial (softmax) model with a matrix of thetas
 """
 
-from typing import Tuple, List
+from functools import partial
+from typing import Callable, Dict, Iterator, NamedTuple, Tuple, List, Optional
 from tqdm import tqdm  # type: ignore
 import numpy as np  # type: ignore
 from fmath import mean_, std_
+from optimizers import DEFAULT_TOL, OPTIMIZERS, LogisticObjective, Optimizer, Updater, \
+    backtracking_descent, newton, lbfgs
+from checkpoint import save_checkpoint, load_checkpoint
+from parallel_utils import ArrayDescriptor, SharedArray, attach_array, run_in_pool
+
+MODES = ['ovr', 'stacked', 'softmax']
+SOLVERS = ['gd', 'minibatch', 'sgd', 'newton', 'lbfgs']
+STOCHASTIC_SOLVERS = ['minibatch', 'sgd']
+SCHEDULES = ['constant', 'invscaling']
+CRITERIA = ['gradient', 'loss']
+EPSILON = 1e-15
+
+
+def load_thetas(filename: str) -> List:
+    """
+    The function loads thetas of a model saved by LOGREG_TRAIN script
+
+    Args:
+        filename: a name of .npy file
+
+    Returns:
+        A list of pairs: thetas of a class and its name
+    """
+    return [tuple(item) for item in np.load(filename, allow_pickle=True)]
+
+
+class EarlyStopping(NamedTuple):
+    """
+    EarlyStopping defines when gradient descent stops before the last iteration
+
+    Attributes:
+        tol: a tolerance, None to run all iterations
+        check_every: a number of iterations between checks of convergence
+        criterion: 'gradient' to stop when a norm of the mean gradient is less than tol,
+          'loss' to stop when the log loss decreases by less than tol between checks
+    """
+    tol: Optional[float] = None
+    check_every: int = 100
+    criterion: str = 'gradient'
+
+    def measure(self, gradient: np.array, probabilities: Optional[np.array],
+                targets: np.array, previous: np.array, multinomial: bool = False) -> \
+            Tuple[np.array, np.array]:
+        """
+        The method calculates a measure of convergence for each classifier (column)
+
+        Args:
+            gradient: a gradient: a column for each classifier
+            probabilities: probabilities of classes for rows, they are used by 'loss' criterion
+            targets: target values for rows
+            previous: values of loss at the previous check
+            multinomial: whether probabilities are probabilities of the softmax model
+
+        Returns:
+            measures to compare with tol
+            values of loss for the next check
+        """
+        rows = max(len(targets), 1)
+        if self.criterion == 'gradient':
+            return np.sqrt(np.sum(gradient * gradient, axis=0)) / rows, previous
+        probabilities = np.clip(probabilities, EPSILON, 1 - EPSILON)
+        loss = targets * np.log(probabilities)
+        if not multinomial:
+            loss += (1 - targets) * np.log(1 - probabilities)
+        loss = -np.sum(loss, axis=0) / rows
+        return previous - loss, loss
+
+
+def _gradient_descent(data_x: np.array, y_copy: np.array, alpha: np.float64, n_iter: int,
+                      progress: bool = True, stopping: EarlyStopping = EarlyStopping(),
+                      optimizer: Optimizer = Optimizer(), decay: float = 0.0,
+                      initial: Optional[np.array] = None,
+                      resume: Optional[Tuple[int, float, Dict[str, np.array]]] = None,
+                      checkpoint: Optional[Callable[[int, np.array, float, Updater], None]] = None,
+                      checkpoint_every: int = 0) -> Tuple[np.array, int]:
+    """
+    The function trains a single one-vs-rest classifier by gradient descent
+
+    Args:
+        data_x: a design matrix
+        y_copy: a target column: 1 for rows of the class, else 0
+        alpha: an alpha step
+        n_iter: quantity of iterations
+        progress: whether to show a progress bar
+        stopping: a rule of early stopping
+        optimizer: an update rule of gradient descent
+        decay: a decay of the alpha step: alpha / (1 + decay * iteration)
+        initial: initial thetas, None to start from ones
+        resume: a state to continue training from: a number of the next iteration,
+          the loss at the last check and arrays of the state of the update rule
+        checkpoint: a function to save a checkpoint: it gets a number of the next iteration,
+          thetas, the loss at the last check and the update rule
+        checkpoint_every: a number of iterations between checkpoints
+
+    Returns:
+        A thetas array
+        quantity of done iterations
+    """
+    output = np.empty(data_x.shape[0], dtype=data_x.dtype)
+    gradient = np.empty(data_x.shape[1], dtype=data_x.dtype)
+    thetas = np.ones(data_x.shape[1], dtype=data_x.dtype) if initial is None \
+        else np.array(initial, dtype=data_x.dtype)
+    step = optimizer.updater(thetas.shape, data_x.dtype)
+    start, previous = 0, np.inf
+    if resume is not None:
+        start, previous, arrays = resume
+        step.load(arrays)
+    for iteration in tqdm(range(start, n_iter), initial=start, total=n_iter,
+                          disable=not progress):
+        np.dot(data_x, thetas, out=output)
+        probabilities = MyLogisticRegressionClass._sigmoid(output)
+        errors = y_copy - probabilities
+        np.dot(data_x.T, errors, out=gradient)
+        if stopping.tol is not None and (iteration + 1) % stopping.check_every == 0:
+            measure, previous = stopping.measure(gradient, probabilities, y_copy, previous)
+            if measure < stopping.tol:
+                return thetas, iteration + 1
+        thetas += step(gradient, alpha / (1 + decay * iteration))
+        if checkpoint is not None and (iteration + 1) % checkpoint_every == 0:
+            checkpoint(iteration + 1, thetas, float(previous), step)
+    return thetas, n_iter
+
+
+def _fit_class_task(task: Tuple[ArrayDescriptor, ArrayDescriptor, int, np.float64, int,
+                                EarlyStopping, Optimizer, float, np.array]) -> \
+        Tuple[np.array, int]:
+    """
+    The function is a task of a worker process: it trains a one-vs-rest classifier
+    for a class on the design matrix and the target matrix in shared memory
+
+    Args:
+        task: descriptors of the design matrix and of the one-hot target matrix,
+          a column of the class, an alpha step, quantity of iterations, a rule of early stopping,
+          an update rule, a decay of the alpha step, initial thetas
+
+    Returns:
+        A thetas array
+        quantity of done iterations
+    """
+    x_descriptor, y_descriptor, column, alpha, n_iter, stopping, optimizer, decay, initial = task
+    x_shm, data_x = attach_array(x_descriptor)
+    y_shm, targets = attach_array(y_descriptor)
+    try:
+        return _gradient_descent(data_x, targets[:, column], alpha, n_iter, progress=False,
+                                 stopping=stopping, optimizer=optimizer, decay=decay,
+                                 initial=initial)
+    finally:
+        del data_x, targets
+        x_shm.close()
+        y_shm.close()
 
 
 class MyLogisticRegressionClass:
@@ -20,13 +186,93 @@ class MyLogisticRegressionClass:
         thetas: an array of coefficient of a regression
         alpha: an alpha step
         n_iter: quantity of iterations
+        mode: a mode of training: 'ovr', 'stacked' or 'softmax'
+        jobs: a number of worker processes to train one-vs-rest classifiers in 'ovr' mode
+          by 'gd' solver without backtracking, other modes and solvers require 1
+        solver: a solver: 'gd' (full-batch gradient descent), 'minibatch' or 'sgd'
+          (stochastic gradient descent), 'newton' (IRLS) or 'lbfgs' (second-order solvers
+          with a line search)
+        batch_size: a number of rows in a batch of 'minibatch' solver, 'sgd' uses 1 row
+        epochs: a number of passes over the data set for stochastic solvers
+        eta0: an initial learning rate of stochastic solvers: a step on the mean
+          gradient of a batch
+        schedule: a schedule of learning rate: 'constant' or 'invscaling' (eta0 / sqrt(epoch))
+        shuffle: whether to shuffle rows before each epoch
+        seed: a seed for shuffling
+        stopping: a rule of early stopping of 'gd' solver
+        optimizer: an update rule of 'gd' and stochastic solvers, backtracking requires
+          a full-batch solver
+        dtype: a float type of computations: float64 or float32
+        decay: a decay of the alpha step of 'gd' solver: alpha / (1 + decay * iteration)
+        warm_start: thetas to start training from: pairs of an array and a name of class,
+          classes without thetas start as without warm start
+        checkpoint: a name of directory for checkpoints of training, None to train without them;
+          checkpoints are supported by 'gd' solver in one process without backtracking
+          and by stochastic solvers
+        checkpoint_every: a number of iterations between checkpoints of 'gd' solver,
+          stochastic solvers save a checkpoint after each epoch
+        resume: whether to continue training from the checkpoint
+        scaling_: means and standard deviations of features which scale the design matrix
+          of training, None if they are unknown
+        n_iter_: quantities of done iterations for trained classes
     """
-    def __init__(self, thetas: List = None, alpha: np.float64 = 5e-5, n_iter: int = 30000) -> None:
+    def __init__(self, thetas: List = None, alpha: np.float64 = 5e-5, n_iter: int = 30000,
+                 mode: str = 'stacked', jobs: int = 1, solver: str = 'gd', batch_size: int = 32,
+                 epochs: int = 10, eta0: np.float64 = 0.5, schedule: str = 'invscaling',
+                 shuffle: bool = True, seed: int = 0,
+                 stopping: EarlyStopping = EarlyStopping(),
+                 optimizer: Optimizer = Optimizer(), dtype: str = 'float64', decay: float = 0.0,
+                 warm_start: Optional[List] = None, checkpoint: Optional[str] = None,
+                 checkpoint_every: int = 1000, resume: bool = False,
+                 scaling: Optional[Tuple[np.array, np.array]] = None) -> None:
         """
         Initializes object of MyLogisticRegressionClass with initial values
         """
+        if mode not in MODES:
+            raise ValueError('Unknown mode of training ' + mode)
+        if solver not in SOLVERS:
+            raise ValueError('Unknown solver ' + solver)
+        if schedule not in SCHEDULES:
+            raise ValueError('Unknown schedule of learning rate ' + schedule)
         self.alpha = alpha
         self.n_iter = n_iter
+        self.mode = mode
+        self.jobs = jobs
+        self.solver = solver
+        self.batch_size = 1 if solver == 'sgd' else batch_size
+        self.epochs = epochs
+        self.eta0 = eta0
+        self.schedule = schedule
+        self.shuffle = shuffle
+        self.seed = seed
+        if stopping.criterion not in CRITERIA:
+            raise ValueError('Unknown criterion of early stopping ' + stopping.criterion)
+        self.stopping = stopping
+        if optimizer.method not in OPTIMIZERS:
+            raise ValueError('Unknown optimizer ' + optimizer.method)
+        if optimizer.method == 'backtracking' and solver in STOCHASTIC_SOLVERS:
+            raise ValueError('Backtracking requires a full-batch solver')
+        if jobs > 1 and (mode != 'ovr' or solver != 'gd' or optimizer.method == 'backtracking'):
+            raise ValueError('Several jobs are supported only in ovr mode by gd solver '
+                             'without backtracking')
+        self.optimizer = optimizer
+        if np.dtype(dtype) not in (np.float64, np.float32):
+            raise ValueError('Unsupported dtype ' + str(dtype))
+        self.dtype = np.dtype(dtype)
+        self.decay = decay
+        self.warm_start = warm_start
+        if checkpoint is not None and (solver not in ['gd'] + STOCHASTIC_SOLVERS or
+                                       optimizer.method == 'backtracking' or
+                                       (mode == 'ovr' and jobs > 1 and solver == 'gd')):
+            raise ValueError('Checkpoints are supported by gd solver in one process '
+                             'and by stochastic solvers')
+        if checkpoint_every < 1:
+            raise ValueError('A number of iterations between checkpoints has to be positive')
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.resume = resume
+        self.scaling_ = scaling
+        self.n_iter_: List[int] = []
         self.thetas = [] if thetas is None else thetas
 
     def fit(self, dataset: List[np.array], features: List[str]) -> List:
@@ -42,20 +288,393 @@ class MyLogisticRegressionClass:
             A thetas array
         """
         data_x, data_y = self.processing(dataset, features)
-        data_x = np.insert(data_x, 0, 1, axis=1)
-        for house in np.unique(data_y):
-            print('Model training for house ', house)
-            y_copy = np.where(data_y == house, 1, 0)
-            thetas: List[np.float64] = np.ones(np.array(data_x).shape[1])
-
-            for _ in tqdm(range(self.n_iter)):
-                output = np.array(np.array(data_x).dot(thetas), dtype=np.float64)
-                errors = np.array(y_copy - self._sigmoid(output), dtype=np.float64)
-                gradient = np.array(np.dot(np.array(data_x).T, errors), dtype=np.float64)
-                thetas += self.alpha * gradient
-            self.thetas.append((thetas, house))
+        return self.fit_design(np.insert(data_x, 0, 1, axis=1), data_y)
+
+    def fit_design(self, data_x: np.array, data_y: np.array, classes: List[str] = None) -> List:
+        """
+        The method calculates and returns an array of thetas values on a design matrix.
+        The matrix is used in place: it is not copied.
+
+        Args:
+            data_x: a design matrix: the bias column and scaled features
+            data_y: a target column: marks or codes of classes
+            classes: a list of names of classes if data_y contains codes of classes
+
+        Returns:
+            A thetas array
+        """
+        labels, targets = self._targets(data_y, classes, data_x.dtype)
+        if self.solver in ('newton', 'lbfgs') or self.optimizer.method == 'backtracking':
+            print('Model training for houses ', ', '.join(str(label) for label in labels),
+                  'by', self.solver, 'solver' if self.solver in ('newton', 'lbfgs')
+                  else 'solver with backtracking optimizer')
+            thetas, n_iter = self._fit_line_search(data_x, targets, labels)
+            for label, iterations in zip(labels, n_iter):
+                print('Model for house ', label, 'is trained in', int(iterations), 'iterations')
+        elif self.solver in STOCHASTIC_SOLVERS:
+            print('Model training for houses ', ', '.join(str(label) for label in labels),
+                  'by', self.solver, 'solver')
+            initial = self._initial(labels, data_x.shape[1], data_x.dtype, 1)
+            thetas = self._fit_stochastic(lambda: iter([(data_x, targets)]), initial, labels,
+                                          len(data_x))
+            n_iter = np.full(len(labels), self.epochs)
+        elif self.mode == 'ovr':
+            thetas, n_iter = self._fit_ovr(data_x, targets, labels)
+        else:
+            print('Model training for houses ', ', '.join(str(label) for label in labels))
+            thetas, n_iter = self._fit_stacked(data_x, targets, labels)
+        if self.solver == 'gd' and self.stopping.tol is not None:
+            for label, iterations in zip(labels, n_iter):
+                print('Model for house ', label, 'is trained in', int(iterations), 'iterations')
+        self.n_iter_.extend(int(iterations) for iterations in n_iter)
+        self.thetas.extend((thetas[:, idx].copy(), label) for idx, label in enumerate(labels))
+        return self.thetas
+
+    def fit_blocks(self, blocks: Callable[[], Iterator[Tuple[np.array, np.array]]],
+                   classes: List[str]) -> List:
+        """
+        The method calculates and returns an array of thetas values by a stochastic solver
+        on blocks of rows: only one block is kept in memory. Blocks are read again
+        for each epoch, rows are shuffled inside of a block.
+
+        Args:
+            blocks: a function which returns an iterator over blocks for an epoch:
+              a design matrix of a block and codes of classes of its rows
+            classes: a list of names of classes: a name for each code
+
+        Returns:
+            A thetas array
+        """
+        if self.solver not in STOCHASTIC_SOLVERS:
+            raise ValueError('Training on blocks requires a stochastic solver')
+        eye = np.eye(len(classes), dtype=self.dtype)
+        columns = None
+        for data_x, _ in blocks():
+            columns = data_x.shape[1]
+            break
+        if columns is None:
+            raise ValueError('No data to train the model')
+        print('Model training for houses ', ', '.join(classes), 'by', self.solver,
+              'solver on blocks')
+        thetas = self._fit_stochastic(lambda: ((data_x, eye[np.asarray(codes, dtype=np.intp)])
+                                               for data_x, codes in blocks()),
+                                      self._initial(classes, columns, self.dtype, 1), classes)
+        self.n_iter_.extend(self.epochs for _ in classes)
+        self.thetas.extend((thetas[:, idx].copy(), label) for idx, label in enumerate(classes))
         return self.thetas
 
+    def _initial(self, labels: List, columns: int, dtype: np.dtype, fill: float) -> np.array:
+        """
+        The method returns initial thetas for classes: thetas of warm start
+        or the fill value for classes without them
+
+        Args:
+            labels: a list of names of classes
+            columns: a quantity of columns of a design matrix
+            dtype: a float type of thetas
+            fill: an initial value of thetas without warm start
+
+        Returns:
+            A matrix of thetas: a column for each class
+
+        Raises:
+            ValueError: thetas of warm start do not correspond to the design matrix
+        """
+        thetas = np.full((columns, len(labels)), fill, dtype=dtype)
+        stored = {str(label): theta for theta, label in (self.warm_start or [])}
+        for idx, label in enumerate(labels):
+            if str(label) not in stored:
+                continue
+            theta = np.asarray(stored[str(label)])
+            if theta.shape != (columns,):
+                raise ValueError('Thetas of warm start do not correspond to features')
+            thetas[:, idx] = theta
+        return thetas
+
+    def _checkpoint_config(self, labels: List, shape: Tuple[int, ...]) -> dict:
+        """
+        The method returns a configuration of training: a checkpoint can be used
+        only by training with the same configuration
+
+        Args:
+            labels: a list of names of classes
+            shape: a shape of a design matrix, a quantity of rows is None for blocks
+
+        Returns:
+            A dictionary which is serializable to JSON
+        """
+        return {'mode': self.mode, 'solver': self.solver, 'optimizer': list(self.optimizer),
+                'dtype': str(self.dtype), 'labels': [str(label) for label in labels],
+                'shape': list(shape), 'alpha': self.alpha, 'n_iter': self.n_iter,
+                'decay': self.decay, 'stopping': list(self.stopping), 'epochs': self.epochs,
+                'batch_size': self.batch_size, 'eta0': self.eta0, 'schedule': self.schedule,
+                'shuffle': self.shuffle, 'seed': self.seed}
+
+    def _load_checkpoint(self, config: dict) -> Optional[Tuple[Dict[str, np.array], dict]]:
+        """
+        The method loads the checkpoint to continue training if resume is requested
+
+        Args:
+            config: a configuration of training
+
+        Returns:
+            A dictionary of arrays and a position in training, None to start from the beginning
+
+        Raises:
+            ValueError: the checkpoint is damaged or it was saved by other training
+        """
+        if self.checkpoint is None or not self.resume:
+            return None
+        saved = load_checkpoint(self.checkpoint, config)
+        if saved is None:
+            print('There is no checkpoint', self.checkpoint, ': training from the beginning')
+        else:
+            print('Training is resumed from the checkpoint', self.checkpoint)
+        return saved
+
+    @staticmethod
+    def _targets(data_y: np.array, classes: List[str] = None, dtype: np.dtype = np.float64) -> \
+            Tuple[List, np.array]:
+        """
+        Static method builds the one-hot target matrix: a column for each class
+
+        Args:
+            data_y: a target column: marks or codes of classes
+            classes: a list of names of classes if data_y contains codes of classes
+            dtype: a float type of the matrix
+
+        Returns:
+            a list of names of classes in the order of columns
+            a float matrix: 1 if a row belongs to the class of a column, else 0
+        """
+        values, inverse = np.unique(np.asarray(data_y), return_inverse=True)
+        targets = np.zeros((len(inverse), len(values)), dtype=dtype)
+        targets[np.arange(len(inverse)), inverse.reshape(-1)] = 1
+        labels = list(values) if classes is None else [classes[int(code)] for code in values]
+        return labels, targets
+
+    def _fit_ovr(self, data_x: np.array, targets: np.array, labels: List) -> \
+            Tuple[np.array, np.array]:
+        """
+        The method trains one-vs-rest classifiers one by one by gradient descent.
+        With several jobs classifiers are trained in worker processes which share
+        the design matrix and the target matrix; the result is the same as in one process.
+
+        Args:
+            data_x: a design matrix
+            targets: a one-hot target matrix
+            labels: a list of names of classes
+
+        Returns:
+            A matrix of thetas: a column for each class
+            quantities of done iterations for classes
+        """
+        initial = self._initial(labels, data_x.shape[1], data_x.dtype, 1)
+        if self.jobs > 1 and len(labels) > 1:
+            print('Model training for houses ', ', '.join(str(label) for label in labels),
+                  'in', min(self.jobs, len(labels)), 'processes')
+            with SharedArray(data_x) as shared_x, SharedArray(targets) as shared_y:
+                tasks = [(shared_x.descriptor, shared_y.descriptor, idx, self.alpha, self.n_iter,
+                          self.stopping, self.optimizer, self.decay, initial[:, idx])
+                         for idx in range(len(labels))]
+                results = run_in_pool(_fit_class_task, tasks, self.jobs)
+            return np.column_stack([thetas for thetas, _ in results]), \
+                np.array([n_iter for _, n_iter in results])
+        thetas = initial
+        n_iter = np.full(len(labels), self.n_iter)
+        config = self._checkpoint_config(labels, data_x.shape)
+        first, resume = 0, None
+        saved = self._load_checkpoint(config)
+        if saved is not None:
+            arrays, position = saved
+            thetas[...], n_iter[...] = arrays['thetas'], arrays['n_iter']
+            first = position['label']
+            if position['iteration'] > 0:
+                resume = position['iteration'], float(arrays['previous'][0]), arrays
+        for idx in range(first, len(labels)):
+            print('Model training for house ', labels[idx])
+            checkpoint = None if self.checkpoint is None else \
+                partial(self._save_ovr_checkpoint, config, thetas, n_iter, idx)
+            thetas[:, idx], n_iter[idx] = _gradient_descent(
+                data_x, targets[:, idx], self.alpha, self.n_iter, stopping=self.stopping,
+                optimizer=self.optimizer, decay=self.decay, initial=thetas[:, idx],
+                resume=resume if idx == first else None, checkpoint=checkpoint,
+                checkpoint_every=self.checkpoint_every)
+            if checkpoint is not None:
+                save_checkpoint(self.checkpoint, {'thetas': thetas, 'n_iter': n_iter,
+                                                  'previous': np.array([np.inf])},
+                                config, {'label': idx + 1, 'iteration': 0})
+        return thetas, n_iter
+
+    def _save_ovr_checkpoint(self, config: dict, thetas: np.array, n_iter: np.array, idx: int,
+                             iteration: int, current: np.array, previous: float,
+                             step: Updater) -> None:
+        """
+        The method saves a checkpoint of one-vs-rest training inside of training of a class
+
+        Args:
+            config: a configuration of training
+            thetas: a matrix of thetas of classes, columns of trained classes are final
+            n_iter: quantities of done iterations for classes
+            idx: an index of the class which is being trained
+            iteration: a number of the next iteration of the class
+            current: current thetas of the class
+            previous: the loss of the class at the last check of early stopping
+            step: the update rule of the class
+        """
+        thetas = thetas.copy()
+        thetas[:, idx] = current
+        save_checkpoint(self.checkpoint, dict(step.state, thetas=thetas, n_iter=n_iter,
+                                              previous=np.array([previous])),
+                        config, {'label': idx, 'iteration': iteration})
+
+    def _fit_stacked(self, data_x: np.array, targets: np.array, labels: List) -> \
+            Tuple[np.array, np.array]:
+        """
+        The method trains all classifiers at once by gradient descent on a matrix of thetas:
+        each iteration is a single matrix product for outputs and a single one for gradients.
+        The activation is the sigmoid for 'stacked' mode and the softmax for 'softmax' mode.
+        With early stopping a converged one-vs-rest classifier is not updated anymore,
+        the softmax model stops when the measure of all classes is less than the tolerance.
+
+        Args:
+            data_x: a design matrix
+            targets: a one-hot target matrix
+            labels: a list of names of classes
+
+        Returns:
+            A matrix of thetas: a column for each class
+            quantities of done iterations for classes
+        """
+        output = np.empty(targets.shape, dtype=data_x.dtype)
+        gradient = np.empty((data_x.shape[1], targets.shape[1]), dtype=data_x.dtype)
+        thetas = self._initial(labels, data_x.shape[1], data_x.dtype, 1)
+        step = self.optimizer.updater(thetas.shape, data_x.dtype)
+        activation = self._softmax_inplace if self.mode == 'softmax' else self._sigmoid_inplace
+        active = np.ones(targets.shape[1], dtype=data_x.dtype)
+        n_iter = np.full(targets.shape[1], self.n_iter)
+        previous = np.full(targets.shape[1], np.inf)
+        config = self._checkpoint_config(labels, data_x.shape)
+        start = 0
+        saved = self._load_checkpoint(config)
+        if saved is not None:
+            arrays, position = saved
+            thetas[...], active[...] = arrays['thetas'], arrays['active']
+            n_iter[...], previous[...] = arrays['n_iter'], arrays['previous']
+            step.load(arrays)
+            start = position['iteration']
+        for iteration in tqdm(range(start, self.n_iter), initial=start, total=self.n_iter):
+            np.dot(data_x, thetas, out=output)
+            activation(output)
+            check = self.stopping.tol is not None and \
+                (iteration + 1) % self.stopping.check_every == 0
+            probabilities = output.copy() if check and self.stopping.criterion == 'loss' \
+                else None
+            np.subtract(targets, output, out=output)
+            np.dot(data_x.T, output, out=gradient)
+            if check:
+                measure, previous = self.stopping.measure(gradient, probabilities, targets,
+                                                          previous, self.mode == 'softmax')
+                if self.mode == 'softmax':
+                    measure = np.full(len(measure), np.sum(measure))
+                converged = (measure < self.stopping.tol) & (active > 0)
+                n_iter[converged] = iteration + 1
+                active[converged] = 0
+                step.freeze(converged)
+                if not active.any():
+                    break
+            thetas += step(gradient, self.alpha / (1 + self.decay * iteration) * active) * active
+            if self.checkpoint is not None and (iteration + 1) % self.checkpoint_every == 0:
+                save_checkpoint(self.checkpoint, dict(step.state, thetas=thetas, active=active,
+                                                      n_iter=n_iter, previous=previous),
+                                config, {'iteration': iteration + 1})
+        return thetas, n_iter
+
+    def _fit_line_search(self, data_x: np.array, targets: np.array, labels: List) -> \
+            Tuple[np.array, np.array]:
+        """
+        The method trains all classifiers at once from zero thetas (or thetas of warm start)
+        by 'newton' or 'lbfgs' solver
+        or by gradient descent with backtracking control of the step size.
+        n_iter is max quantity of iterations, the tolerance of early stopping
+        (or DEFAULT_TOL) bounds the norm of the gradient of the mean log loss.
+
+        Args:
+            data_x: a design matrix
+            targets: a one-hot target matrix
+            labels: a list of names of classes
+
+        Returns:
+            A matrix of thetas: a column for each class
+            quantities of done iterations for classes
+        """
+        objective = LogisticObjective(data_x, targets, self.mode == 'softmax')
+        tol = DEFAULT_TOL if self.stopping.tol is None else self.stopping.tol
+        solver = {'newton': newton, 'lbfgs': lbfgs}.get(self.solver, backtracking_descent)
+        initial = self._initial(labels, data_x.shape[1], data_x.dtype, 0)
+        thetas, n_iter = solver(objective, initial, self.n_iter, tol)
+        return thetas, np.full(targets.shape[1], n_iter)
+
+    def _learning_rate(self, epoch: int) -> np.float64:
+        """
+        The method returns a learning rate of stochastic solvers for an epoch
+
+        Args:
+            epoch: a number of epoch from 0
+
+        Returns:
+            A learning rate
+        """
+        if self.schedule == 'invscaling':
+            return float(self.eta0 / np.sqrt(epoch + 1))
+        return float(self.eta0)
+
+    def _fit_stochastic(self, epoch_blocks: Callable[[], Iterator[Tuple[np.array, np.array]]],
+                        thetas: np.array, labels: List, rows: Optional[int] = None) -> np.array:
+        """
+        The method trains all classifiers at once by (mini-batch) stochastic gradient descent
+        on a matrix of thetas: each batch moves thetas on the mean gradient of its rows.
+
+        Args:
+            epoch_blocks: a function which returns an iterator over blocks for an epoch:
+              a design matrix of a block and a one-hot target matrix of the block
+            thetas: initial thetas: a column for each class
+            labels: a list of names of classes
+            rows: a quantity of rows of data, None if it is unknown
+
+        Returns:
+            A matrix of thetas: a column for each class
+        """
+        thetas = np.array(thetas, dtype=self.dtype)
+        step = self.optimizer.updater(thetas.shape, self.dtype)
+        activation = self._softmax_inplace if self.mode == 'softmax' else self._sigmoid_inplace
+        rng = np.random.default_rng(self.seed)
+        config = self._checkpoint_config(labels, (rows, thetas.shape[0]))
+        first = 0
+        saved = self._load_checkpoint(config)
+        if saved is not None:
+            arrays, position = saved
+            thetas[...] = arrays['thetas']
+            step.load(arrays)
+            rng.bit_generator.state = position['rng']
+            first = position['epoch']
+        for epoch in tqdm(range(first, self.epochs), initial=first, total=self.epochs):
+            rate = self._learning_rate(epoch)
+            for data_x, targets in epoch_blocks():
+                order = rng.permutation(len(data_x)) if self.shuffle else None
+                for start in range(0, len(data_x), self.batch_size):
+                    rows = slice(start, start + self.batch_size) if order is None \
+                        else order[start:start + self.batch_size]
+                    batch_x = data_x[rows]
+                    output = np.dot(batch_x, thetas)
+                    activation(output)
+                    np.subtract(targets[rows], output, out=output)
+                    thetas += step(np.dot(batch_x.T, output), rate / len(batch_x))
+            if self.checkpoint is not None:
+                save_checkpoint(self.checkpoint, dict(step.state, thetas=thetas), config,
+                                {'epoch': epoch + 1, 'rng': rng.bit_generator.state})
+        return thetas
+
     def processing(self, dataset: List[np.array], features: List[str], drop_nan: bool = True) -> \
             Tuple[np.array, np.array]:
         """
@@ -75,11 +694,52 @@ class MyLogisticRegressionClass:
             target column
         """
         res_dataset = self._drop_nan(dataset, len(features)) if drop_nan else dataset
-        ds_features = np.array(res_dataset)[:, 1:]
-        ds_target = np.array(res_dataset)[:, 0]
-        np.apply_along_axis(self._scaling, 0, ds_features)
+        res_dataset = np.asarray(res_dataset)
+        ds_features = np.array(res_dataset[:, 1:], dtype=np.float64)
+        ds_target = res_dataset[:, 0]
+        self._scaling(ds_features)
         return ds_features, ds_target
 
+    def design_matrix(self, features: np.array, target: np.array = None, drop_nan: bool = True,
+                      mmap_file: Optional[str] = None,
+                      scaling: Optional[Tuple[np.array, np.array]] = None) -> \
+            Tuple[np.array, Optional[np.array]]:
+        """
+        The method builds a design matrix from a float matrix of features:
+        the first column is the bias column, other columns are scaled features.
+        The matrix is allocated once in dtype of the model: in memory or
+        as a memory-mapped .npy file, features are copied (converted) to it and scaled in place.
+
+        Args:
+            features: a float matrix of features
+            target: a target column for rows of the matrix of features
+            drop_nan: a boolean key, if True the method drops rows with nan values
+            mmap_file: a name of .npy file to back the design matrix, None to keep it in memory
+            scaling: means and standard deviations of features to scale them,
+              None to calculate them on the matrix of features,
+            scaling_ of the model is set to the used scaling
+
+        Returns:
+            a design matrix
+            target column for rows of the design matrix
+        """
+        rows = ~np.isnan(features).any(axis=1) if drop_nan else None
+        shape = (features.shape[0] if rows is None else int(rows.sum()), features.shape[1] + 1)
+        if mmap_file is None:
+            data_x = np.empty(shape, dtype=self.dtype)
+        else:
+            data_x = np.lib.format.open_memmap(mmap_file, mode='w+', dtype=self.dtype,
+                                               shape=shape)
+        data_x[:, 0] = 1
+        if rows is None:
+            data_x[:, 1:] = features
+        else:
+            np.compress(rows, features, axis=0, out=data_x[:, 1:])
+        self.scaling_ = self._scaling(data_x[:, 1:], *(scaling or ()))
+        if target is None:
+            return data_x, None
+        return data_x, np.asarray(target) if rows is None else np.asarray(target)[rows]
+
     @staticmethod
     def _drop_nan(dataset: List[np.array], q_features: int) -> List[np.array]:
         """
@@ -101,23 +761,27 @@ class MyLogisticRegressionClass:
         return np.array(res_dataset, dtype=object)
 
     @staticmethod
-    def _scaling(data: List[np.array]) -> List[np.array]:
+    def _scaling(data: np.array, mean: Optional[np.array] = None,
+                 std: Optional[np.array] = None) -> Tuple[np.array, np.array]:
         """
-        Static method for scaling of data:
+        Static method for scaling of data in place, column by column:
         - to subtract mean of data
         - to divide by the standard deviation
+        Nan values are skipped by calculation of mean and standard deviation.
 
         Args:
-            data: a data set
+            data: a float matrix of features
+            mean: means of columns, None to calculate them on data
+            std: standard deviations of columns, None to calculate them on data
 
         Returns:
-            a scaling data set
+            means and standard deviations which are used for scaling
         """
-        mean_data = mean_(data)
-        std_data = std_(data)
-        for line in enumerate(data):
-            data[line[0]] = (data[line[0]] - mean_data)/std_data
-        return data
+        mean = mean_(data, axis=0) if mean is None else mean
+        data -= mean
+        std = std_(data, axis=0) if std is None else std
+        data /= std
+        return mean, std
 
     @staticmethod
     def _sigmoid(data: np.array) -> np.array:
@@ -133,20 +797,70 @@ class MyLogisticRegressionClass:
         """
         return 1 / (1 + np.exp(-data))
 
-    def _predict_one(self, data_x: np.array) -> np.float64:
+    @staticmethod
+    def _sigmoid_inplace(data: np.array) -> np.array:
+        """
+        Static method to calculate SIGMOID function in place of data
+
+        Args:
+            data: a float array
+
+        Returns:
+            the same array with values of sigmoid function
+        """
+        np.negative(data, out=data)
+        np.exp(data, out=data)
+        data += 1
+        return np.reciprocal(data, out=data)
+
+    @staticmethod
+    def _softmax_inplace(data: np.array) -> np.array:
+        """
+        Static method to calculate SOFTMAX function in place of data row by row:
+        probabilities of classes (columns) for each row
+
+        Args:
+            data: a float matrix: rows are observations, columns are classes
+
+        Returns:
+            the same matrix with values of softmax function
+        """
+        data -= data.max(axis=1, keepdims=True)
+        np.exp(data, out=data)
+        data /= data.sum(axis=1, keepdims=True)
+        return data
+
+    @property
+    def classes_(self) -> List:
         """
-        The method calculates for single data row probabilities to be marks of class
-        After than returns prediction for CLASS: with max value
+        Names of classes of the model in order of columns of the matrix of thetas
+        """
+        return [label for _, label in self.thetas]
+
+    def theta_matrix(self) -> np.array:
+        """
+        The method returns thetas of all classes as a single matrix in dtype of the model
+
+        Returns:
+            A matrix of thetas: a column for each class in order of classes_
+        """
+        return np.column_stack([np.asarray(thetas, dtype=self.dtype)
+                                for thetas, _ in self.thetas])
+
+    def decision_design(self, data_x: np.array) -> np.array:
+        """
+        The method calculates scores of all classes for all rows of a design matrix
+        by a single matrix product
 
         Args:
-            data_x: single data row
+            data_x: a design matrix: the bias column and scaled features
 
         Returns:
-            a probability for the input data row
+            A matrix of scores: rows of the design matrix, a column for each class
         """
-        return max((data_x.dot(w), c) for w, c in self.thetas)[1]
+        return np.dot(np.asarray(data_x, dtype=self.dtype), self.theta_matrix())
 
-    def predict(self, data_x: List[np.array]) -> List[np.array]:
+    def predict(self, data_x: List[np.array]) -> np.array:
         """
         The method predicts marks the CLASS for the entire data set
 
@@ -154,9 +868,95 @@ class MyLogisticRegressionClass:
             data_x: a data set
 
         Returns:
-            List of predictions
+            An array of predictions
+        """
+        return self.predict_design(np.insert(data_x, 0, 1, axis=1))
+
+    def predict_design(self, data_x: np.array) -> np.array:
+        """
+        The method predicts marks the CLASS for a design matrix: a class with
+        the max score for each row
+
+        Args:
+            data_x: a design matrix: the bias column and scaled features
+
+        Returns:
+            An array of predictions
+        """
+        return np.asarray(self.classes_)[np.argmax(self.decision_design(data_x), axis=1)]
+
+    def predict_proba(self, data_x: List[np.array]) -> np.array:
+        """
+        The method calculates probabilities of classes for the entire data set
+
+        Args:
+            data_x: a data set
+
+        Returns:
+            A matrix of probabilities: a row for each row of the data set,
+            a column for each class in order of classes_
         """
-        return [self._predict_one(item) for item in np.insert(data_x, 0, 1, axis=1)]
+        return self.predict_proba_design(np.insert(data_x, 0, 1, axis=1))
+
+    def predict_proba_design(self, data_x: np.array) -> np.array:
+        """
+        The method calculates probabilities of classes for a design matrix.
+        The softmax model returns its probabilities, probabilities of
+        one-vs-rest classifiers are normalized to sum to one in each row.
+
+        Args:
+            data_x: a design matrix: the bias column and scaled features
+
+        Returns:
+            A matrix of probabilities: a row for each row of the design matrix,
+            a column for each class in order of classes_
+        """
+        scores = self.decision_design(data_x)
+        if self.mode == 'softmax':
+            return self._softmax_inplace(scores)
+        self._sigmoid_inplace(scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def fused_theta_matrix(self) -> np.array:
+        """
+        The method returns thetas of all classes with the scaling of training folded in:
+        a product of a matrix of unscaled features with the result (the first row is
+        the bias) equals a product of the scaled design matrix with thetas
+
+        Returns:
+            A matrix of thetas for unscaled features: a column for each class
+
+        Raises:
+            ValueError: the scaling of training is unknown
+        """
+        if self.scaling_ is None:
+            raise ValueError('The scaling of training is unknown')
+        matrix = self.theta_matrix().astype(np.float64)
+        mean, std = (np.asarray(item, dtype=np.float64) for item in self.scaling_)
+        matrix[1:] /= std.reshape(-1, 1)
+        matrix[0] -= np.dot(mean, matrix[1:])
+        return matrix.astype(self.dtype)
+
+    def predict_features(self, features: np.array,
+                         matrix: Optional[np.array] = None) -> np.array:
+        """
+        The method predicts marks the CLASS for a matrix of unscaled features
+        by the scaling of training fused with the matrix product: there is
+        no design matrix and no pass of scaling over the data
+
+        Args:
+            features: a float matrix of features
+            matrix: a result of fused_theta_matrix method to reuse it between calls,
+              None to calculate it
+
+        Returns:
+            An array of predictions
+        """
+        matrix = self.fused_theta_matrix() if matrix is None else matrix
+        scores = np.dot(np.asarray(features, dtype=self.dtype), matrix[1:])
+        scores += matrix[0]
+        return np.asarray(self.classes_)[np.argmax(scores, axis=1)]
 
     def score(self, dataset: List[np.array], features: List[str]) -> np.float64:
         """
@@ -170,4 +970,20 @@ class MyLogisticRegressionClass:
             Accuracy score
         """
         data_x, data_y = self.processing(dataset, features)
-        return sum(self.predict(data_x) == data_y) / len(data_y)
+        return np.mean(self.predict(data_x) == data_y)
+
+    def score_design(self, data_x: np.array, data_y: np.array,
+                     classes: List[str] = None) -> np.float64:
+        """
+        The method calculates score on a design matrix: accuracy of the model
+
+        Args:
+            data_x: a design matrix: the bias column and scaled features
+            data_y: a target column: marks or codes of classes
+            classes: a list of names of classes if data_y contains codes of classes
+
+        Returns:
+            Accuracy score
+        """
+        labels = data_y if classes is None else np.asarray(classes)[data_y]
+        return np.mean(self.predict_design(data_x) == labels)
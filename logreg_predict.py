@@ -8,35 +8,121 @@ The module contains functions for LOGREG_PREDICT script: it makes predictions fo
 """
 
 import sys
+import argparse
+from typing import Optional
 import numpy as np  # type: ignore
 from logreg import MyLogisticRegressionClass
-from csv_utils import load_csv, save_houses
-from data_utils import preprocessing
+from csv_utils import HOUSES_HEADER, TypedDataset, iter_csv_blocks, open_output, \
+    save_houses, select_features, write_houses
+from dataset_cache import load_csv_cached
+from model_store import ModelBundle, load_model
 from stream_funcs import error_message, success_message
 from arg_utils import options_parse_model
 
 
+def predict_bundle(bundle: ModelBundle, dataset: TypedDataset) -> np.array:
+    """
+    The function predicts houses by a model bundle: features are selected by numbers
+    of features of the bundle and scaled by the scaling of training fused with thetas
+
+    Args:
+        bundle: a loaded model bundle
+        dataset: a data set with all features
+
+    Returns:
+        An array of predictions
+
+    Raises:
+        ValueError: features of the data set differ from features of the model
+    """
+    dataset = select_features(dataset, bundle.feature_numbers)
+    if dataset.feature_names != bundle.features:
+        raise ValueError('Features of the data set differ from features of the model')
+    return bundle.model.predict_features(dataset.features)
+
+
+def predict_legacy(lrc: MyLogisticRegressionClass, dataset: TypedDataset,
+                   mmap_file: Optional[str]) -> np.array:
+    """
+    The function predicts houses by thetas of old versions: features are scaled
+    by statistics of the data set itself
+
+    Args:
+        lrc: the model
+        dataset: a data set with features which are selected by the file of numbers of features
+        mmap_file: a name of .npy file to back the design matrix, None to keep it in memory
+
+    Returns:
+        An array of predictions
+    """
+    data_x, _ = lrc.design_matrix(dataset.features, drop_nan=False, mmap_file=mmap_file)
+    return lrc.predict_design(data_x)
+
+
+def predict_stream(args: argparse.Namespace, bundle: ModelBundle) -> None:
+    """
+    The function reads the data set by blocks of rows, predicts houses for each block
+    by a model bundle and appends predictions of the block to the output file,
+    so memory is bounded by the size of a block. A not atomic file is flushed
+    after each block, so predictions can be read while they are written.
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        bundle: a loaded model bundle
+    """
+    try:
+        with open_output(args.output, args.gzip or None, args.atomic) as data_file:
+            data_file.write(HOUSES_HEADER)
+            index = 0
+            for block, _ in iter_csv_blocks(args, block_size=args.block_size,
+                                            feature_list=bundle.feature_numbers):
+                index = write_houses(data_file, predict_bundle(bundle, block), index)
+                if not args.atomic:
+                    data_file.flush()
+        success_message('Predictions are saved to ' + args.output)
+    except IOError:
+        data = sys.exc_info()[1]
+        if data is not None:
+            error_message(str(data))
+        error_message('It is impossible to save predictions')
+        sys.exit(1)
+
+
 def do_main_function():
     """
     The main function of the script
     """
     args = options_parse_model(True)
-    dataset = load_csv(args, True)
-    _, features, data = preprocessing(dataset)
-
+    if args.atomic is None:
+        args.atomic = not args.stream
     try:
-        thetas = np.load(args.thetas_file)
-    except FileNotFoundError:
-        error_message('It is impossible to find and open file with thetas array')
-        error_message(str(sys.exc_info()[1].args[1]))
+        bundle = load_model(args.thetas_file, args.dtype)
+    except (OSError, ValueError):
+        error_message('It is impossible to load the model from ' + args.thetas_file)
         sys.exit(-1)
+    if args.mmap_file is not None and bundle.features is not None:
+        error_message('Option -m is used only with thetas of old versions: a model bundle '
+                      'predicts without a design matrix')
+        sys.exit(1)
+
+    if args.stream:
+        if bundle.features is None:
+            error_message('Stream mode requires a model bundle: thetas of old versions '
+                          'have no scaling of training')
+            sys.exit(1)
+        try:
+            predict_stream(args, bundle)
+        except ValueError:
+            error_message('Features of the data set differ from features of the model')
+            sys.exit(1)
+        return
 
-    lrc = MyLogisticRegressionClass(thetas=thetas)
-    data_x, _ = lrc.processing(data, features, False)
     try:
-        predicts = lrc.predict(data_x)
-        save_houses(predicts)
-        success_message("Predictions saved to houses.csv")
+        if bundle.features is None:
+            predicts = predict_legacy(bundle.model, load_csv_cached(args, True), args.mmap_file)
+        else:
+            predicts = predict_bundle(bundle, load_csv_cached(args))
+        save_houses(predicts, args.output, args.gzip or None, args.atomic)
     except ValueError:
         error_message('Dimensions of the data set, the thetas array are different')
         error_message('It is impossible to predict values for the data set')
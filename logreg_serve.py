@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+The module contains LOGREG_SERVE script: a long-lived local prediction service.
+The model bundle is loaded once, predictions are served over HTTP on a TCP port
+or on a Unix socket. Rows of concurrent requests are joined into micro-batches:
+a micro-batch is predicted by a single matrix product.
+
+Endpoints:
+    - POST /predict: a JSON body ({"rows": [...]} or a list of rows; a row is a list of
+      values of features of the model or an object: a name of feature -> a value) or
+      a CSV body (Content-Type: text/csv) with a header which contains names of features
+      of the model; the response has the same format as the request
+    - GET /stats: counters of latency and throughput of the service
+    - GET /health: classes and features of the model
+
+  Typical usage example:
+
+  ./logreg_serve.py model --port 8080
+  curl -d '{"rows": [[-502.3, 4.7, -5.9]]}' http://127.0.0.1:8080/predict
+"""
+
+import io
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+from functools import partial
+from typing import Dict, List, Tuple
+import numpy as np  # type: ignore
+from csv_utils import HOUSES_HEADER, write_houses
+from exceptions import RequestException
+from model_store import ModelBundle, load_model
+from stream_funcs import error_message, success_message
+from arg_utils import options_parse_serve
+
+MAX_BODY_SIZE = 64 << 20
+LATENCY_WINDOW = 10000
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ServiceStats:
+    """
+    The class of counters of the service: latency of the last requests and throughput
+
+    Attributes:
+        started: a time of the start of the service
+        requests: a number of answered requests
+        errors: a number of requests answered with an error
+        rows: a number of predicted rows
+        batches: a number of micro-batches
+        latencies: latencies of the last requests in seconds (a ring buffer)
+    """
+    def __init__(self) -> None:
+        """
+        Initializes counters with zeros
+        """
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.latencies = np.zeros(LATENCY_WINDOW)
+
+    def record_request(self, latency: float, error: bool = False) -> None:
+        """
+        The method counts an answered request
+
+        Args:
+            latency: a time from reading of the request to the response in seconds
+            error: whether the request is answered with an error
+        """
+        self.latencies[self.requests % LATENCY_WINDOW] = latency
+        self.requests += 1
+        self.errors += int(error)
+
+    def record_batch(self, rows: int) -> None:
+        """
+        The method counts a predicted micro-batch
+
+        Args:
+            rows: a number of rows of the micro-batch
+        """
+        self.batches += 1
+        self.rows += rows
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        The method returns values of counters: latencies are in milliseconds,
+        throughput is an average since the start of the service
+
+        Returns:
+            A dictionary which is serializable to JSON
+        """
+        uptime = time.monotonic() - self.started
+        latencies = self.latencies[:min(self.requests, LATENCY_WINDOW)] * 1000
+        counters = {'uptime_s': uptime, 'requests': self.requests, 'errors': self.errors,
+                    'rows': self.rows, 'batches': self.batches,
+                    'rows_per_batch': self.rows / self.batches if self.batches else 0.0,
+                    'requests_per_s': self.requests / uptime if uptime else 0.0,
+                    'rows_per_s': self.rows / uptime if uptime else 0.0}
+        if len(latencies):
+            counters.update({'latency_mean_ms': float(np.mean(latencies)),
+                             'latency_p50_ms': float(np.percentile(latencies, 50)),
+                             'latency_p90_ms': float(np.percentile(latencies, 90)),
+                             'latency_p99_ms': float(np.percentile(latencies, 99)),
+                             'latency_max_ms': float(np.max(latencies))})
+        return counters
+
+
+class MicroBatcher:
+    """
+    The class joins rows of concurrent requests into micro-batches: a micro-batch
+    is collected until it has max_rows rows or max_delay seconds are passed since
+    its first request, then it is predicted by a single matrix product
+
+    Attributes:
+        bundle: the model bundle
+        max_rows: a max number of rows in a micro-batch (a request is never split)
+        max_delay: a max time to wait for concurrent requests in seconds
+        stats: counters of the service
+        queue: a queue of requests: a matrix of features and a future of predictions
+        matrix: thetas of the model with the scaling of training folded in
+    """
+    def __init__(self, bundle: ModelBundle, max_rows: int, max_delay: float,
+                 stats: ServiceStats) -> None:
+        """
+        Initializes the batcher with an empty queue, the scaling is folded into thetas once
+        """
+        self.bundle = bundle
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.stats = stats
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.matrix = bundle.model.fused_theta_matrix()
+
+    async def predict(self, features: np.array) -> np.array:
+        """
+        The method predicts houses for rows of a request in a micro-batch
+
+        Args:
+            features: a float matrix of features of the model
+
+        Returns:
+            An array of predictions
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.array, asyncio.Future]]:
+        """
+        The method waits for requests and collects a micro-batch
+
+        Returns:
+            A list of requests of the micro-batch
+        """
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        rows = len(items[0][0])
+        deadline = loop.time() + self.max_delay
+        while rows < self.max_rows:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    async def run(self) -> None:
+        """
+        The method predicts micro-batches while the service works.
+        The matrix product runs in a worker thread, so requests are read meanwhile.
+        An error of a micro-batch is passed to its requests, the loop goes on.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            try:
+                features = np.vstack([features for features, _ in items])
+                predictions = await loop.run_in_executor(
+                    None, self.bundle.model.predict_features, features, self.matrix)
+            except Exception as exception:  # pylint: disable=broad-except
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(exception)
+                continue
+            self.stats.record_batch(len(features))
+            start = 0
+            for rows, future in items:
+                if not future.done():
+                    future.set_result(predictions[start:start + len(rows)])
+                start += len(rows)
+
+
+def _to_float(value) -> float:
+    """
+    The function converts a value of a feature from a request to a float number,
+    an empty value is nan
+
+    Args:
+        value: a value: a number, a string, None
+
+    Returns:
+        A float number
+
+    Raises:
+        RequestException: the value is not a number
+    """
+    if value is None or value == '':
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RequestException(400, f'Wrong value of a feature: {value!r}') from None
+
+
+def parse_json_rows(body: bytes, features: List[str]) -> np.array:
+    """
+    The function parses rows of a JSON request to a float matrix of features
+
+    Args:
+        body: a body of the request
+        features: a list of names of features of the model
+
+    Returns:
+        A float matrix of features
+
+    Raises:
+        RequestException: the request is wrong
+    """
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise RequestException(400, 'A body is not valid JSON') from None
+    if isinstance(rows, dict):
+        rows = rows.get('rows')
+    if not isinstance(rows, list):
+        raise RequestException(400, 'A body has to be a list of rows or {"rows": [...]}')
+    matrix = np.empty((len(rows), len(features)))
+    for idx, row in enumerate(rows):
+        if isinstance(row, dict):
+            try:
+                row = [row[name] for name in features]
+            except KeyError as exception:
+                raise RequestException(400, f'A row has no feature {exception}') from None
+        if not isinstance(row, list) or len(row) != len(features):
+            raise RequestException(400, f'A row has to contain {len(features)} features: '
+                                        + ', '.join(features))
+        matrix[idx] = [_to_float(value) for value in row]
+    return matrix
+
+
+def parse_csv_rows(body: bytes, features: List[str]) -> np.array:
+    """
+    The function parses rows of a CSV request to a float matrix of features:
+    columns are found by names in the header, other columns are skipped
+
+    Args:
+        body: a body of the request
+        features: a list of names of features of the model
+
+    Returns:
+        A float matrix of features
+
+    Raises:
+        RequestException: the request is wrong
+    """
+    try:
+        reader = csv.reader(io.StringIO(body.decode()))
+        header = next(reader, [])
+        columns = [header.index(name) for name in features]
+        return np.array([[_to_float(row[column]) for column in columns]
+                         for row in reader if row], dtype=np.float64).reshape(-1, len(features))
+    except (UnicodeDecodeError, csv.Error):
+        raise RequestException(400, 'A body is not valid CSV') from None
+    except ValueError:
+        raise RequestException(400, 'A header has to contain features: '
+                                    + ', '.join(features)) from None
+    except IndexError:
+        raise RequestException(400, 'A row has less columns than the header') from None
+
+
+class PredictionService:
+    """
+    The class of the prediction service: it answers HTTP requests
+
+    Attributes:
+        bundle: the model bundle
+        stats: counters of the service
+        batcher: the micro-batcher of predictions
+    """
+    def __init__(self, bundle: ModelBundle, max_rows: int, max_delay: float) -> None:
+        """
+        Initializes the service
+        """
+        self.bundle = bundle
+        self.stats = ServiceStats()
+        self.batcher = MicroBatcher(bundle, max_rows, max_delay, self.stats)
+
+    async def predict(self, headers: Dict[str, str], body: bytes) -> Tuple[str, bytes]:
+        """
+        The method answers a request of predictions
+
+        Args:
+            headers: headers of the request: lowercase names -> values
+            body: a body of the request
+
+        Returns:
+            A content type and a body of the response
+        """
+        is_csv = headers.get('content-type', '').split(';')[0].strip() == 'text/csv'
+        features = (parse_csv_rows if is_csv else parse_json_rows)(body, self.bundle.features)
+        predictions = await self.batcher.predict(features) if len(features) else []
+        if not is_csv:
+            return 'application/json', json.dumps({'houses': list(predictions)}).encode()
+        output = io.StringIO()
+        output.write(HOUSES_HEADER)
+        write_houses(output, predictions)
+        return 'text/csv', output.getvalue().encode()
+
+    async def respond(self, method: str, path: str, headers: Dict[str, str],
+                      body: bytes) -> Tuple[int, str, bytes]:
+        """
+        The method answers a HTTP request
+
+        Args:
+            method: a method of the request
+            path: a path of the request
+            headers: headers of the request: lowercase names -> values
+            body: a body of the request
+
+        Returns:
+            A status code, a content type and a body of the response
+        """
+        routes = {'/predict': 'POST', '/stats': 'GET', '/health': 'GET'}
+        try:
+            if path not in routes:
+                raise RequestException(404, 'Unknown path ' + path)
+            if method != routes[path]:
+                raise RequestException(405, f'Use {routes[path]} for {path}')
+            if path == '/predict':
+                return (200, *await self.predict(headers, body))
+            if path == '/stats':
+                answer = self.stats.to_dict()
+            else:
+                answer = {'status': 'ok', 'classes': self.bundle.model.classes_,
+                          'features': self.bundle.features}
+            return 200, 'application/json', json.dumps(answer).encode()
+        except RequestException as exception:
+            return exception.status, 'application/json', \
+                json.dumps({'error': exception.message}).encode()
+        except Exception as exception:  # pylint: disable=broad-except
+            return 500, 'application/json', json.dumps({'error': str(exception)}).encode()
+
+
+async def read_request(reader: asyncio.StreamReader) -> \
+        Tuple[str, str, str, Dict[str, str], bytes]:
+    """
+    The function reads a HTTP request from a connection
+
+    Args:
+        reader: a reader of the connection
+
+    Returns:
+        A method, a path, a version of HTTP, headers (lowercase names -> values) and a body,
+        an empty method if the connection is closed
+
+    Raises:
+        RequestException: the request is wrong
+    """
+    line = await reader.readline()
+    if not line:
+        return '', '', '', {}, b''
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise RequestException(400, 'Wrong request line') from None
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestException(400, 'Wrong Content-Length') from None
+    if length > MAX_BODY_SIZE:
+        raise RequestException(413, f'A body is larger than {MAX_BODY_SIZE} bytes')
+    body = await reader.readexactly(length) if length > 0 else b''
+    return method, target.split('?')[0], version, headers, body
+
+
+def write_response(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes,
+                   keep_alive: bool) -> None:
+    """
+    The function writes a HTTP response to a connection
+
+    Args:
+        writer: a writer of the connection
+        status: a status code
+        content_type: a content type of the body
+        body: a body
+        keep_alive: whether the connection is kept for next requests
+    """
+    writer.write(f'HTTP/1.1 {status} {REASONS.get(status, "Error")}\r\n'
+                 f'Content-Type: {content_type}\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+                 .encode('latin-1') + body)
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            service: PredictionService) -> None:
+    """
+    The function serves requests of a connection: HTTP/1.1 connections are kept alive
+
+    Args:
+        reader: a reader of the connection
+        writer: a writer of the connection
+        service: the prediction service
+    """
+    try:
+        while True:
+            try:
+                method, path, version, headers, body = await read_request(reader)
+            except RequestException as exception:
+                write_response(writer, exception.status, 'application/json',
+                               json.dumps({'error': exception.message}).encode(), False)
+                await writer.drain()
+                break
+            if not method:
+                break
+            started = time.perf_counter()
+            status, content_type, answer = await service.respond(method, path, headers, body)
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '') != 'close'
+            write_response(writer, status, content_type, answer, keep_alive)
+            await writer.drain()
+            if path == '/predict':
+                service.stats.record_request(time.perf_counter() - started, status != 200)
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args: argparse.Namespace, bundle: ModelBundle) -> None:
+    """
+    The function runs the service until it is interrupted
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        bundle: the model bundle
+    """
+    service = PredictionService(bundle, args.max_batch, args.max_delay / 1000)
+    handler = partial(handle_connection, service=service)
+    if args.unix is not None:
+        server = await asyncio.start_unix_server(handler, path=args.unix)
+        address = args.unix
+    else:
+        server = await asyncio.start_server(handler, args.host, args.port)
+        address = f'http://{args.host}:{args.port}'
+    batcher = asyncio.create_task(service.batcher.run())
+    success_message('The model of houses ' + ', '.join(bundle.model.classes_) +
+                    ' is served on ' + address)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+def do_main_function():
+    """
+    The main function of the script
+    """
+    args = options_parse_serve()
+    try:
+        bundle = load_model(args.model, args.dtype)
+    except (OSError, ValueError):
+        error_message('It is impossible to load the model from ' + args.model)
+        sys.exit(1)
+    if bundle.features is None:
+        error_message('The service requires a model bundle: thetas of old versions '
+                      'have no scaling of training')
+        sys.exit(1)
+    try:
+        asyncio.run(serve(args, bundle))
+    except KeyboardInterrupt:
+        print('The service is stopped')
+    except OSError as exception:
+        error_message('It is impossible to start the service: ' + str(exception))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    do_main_function()
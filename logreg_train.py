@@ -7,14 +7,191 @@ The module contains functions for LOGREG_TRAIN script: it trains the model (the
   args = options_parse()
 """
 
+import sys
+import copy
+import argparse
+from typing import Iterator, List, Optional, Tuple
 import numpy as np  # type: ignore
-from csv_utils import load_csv
-from data_utils import preprocessing
-from logreg import MyLogisticRegressionClass
-from stream_funcs import success_message, normal_message
+from csv_utils import TypedDataset, get_feature_numbers, iter_csv_blocks
+from dataset_cache import load_csv_cached
+from data_utils import TARGET_NAME
+from logreg import MyLogisticRegressionClass, EarlyStopping, STOCHASTIC_SOLVERS
+from model_store import ModelBundle, save_model, load_model
+from summary import StreamSummary
+from optimizers import Optimizer
+from stream_funcs import error_message, success_message, normal_message
 from arg_utils import options_parse_model
 
 
+def get_stream_scaling(args: argparse.Namespace) -> \
+        Tuple[Tuple[np.array, np.array], List[str], List[str], List[int]]:
+    """
+    The function reads the data set by blocks of rows and calculates means and
+    standard deviations of features over rows without nan values
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+
+    Returns:
+        means and standard deviations of features
+        a list of names of classes: a name for each code
+        a list of names of features
+        a list of numbers of features
+    """
+    summary = None
+    classes: List[str] = []
+    numbers: List[int] = []
+    for block, _ in iter_csv_blocks(args, True, args.block_size):
+        if summary is None:
+            print('Features are: ', block.feature_names)
+            summary = StreamSummary(block.feature_names)
+            numbers = get_feature_numbers(block.header, block.feature_names)
+        summary.update_moments(block.features[~np.isnan(block.features).any(axis=1)])
+        classes = block.categories[TARGET_NAME]
+    if summary is None:
+        return (np.empty(0), np.empty(0)), classes, [], numbers
+    return summary.scaling(), classes, summary.features, numbers
+
+
+def iter_design_blocks(args: argparse.Namespace, lrc: MyLogisticRegressionClass,
+                       scaling: Tuple[np.array, np.array]) -> Iterator[Tuple[np.array, np.array]]:
+    """
+    The generator reads the data set by blocks of rows and yields design matrices of blocks
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        lrc: the model
+        scaling: means and standard deviations of features
+
+    Yields:
+        A design matrix of a block and codes of classes of its rows
+    """
+    for block, _ in iter_csv_blocks(args, True, args.block_size):
+        yield lrc.design_matrix(block.features, block.codes[TARGET_NAME], scaling=scaling)
+
+
+def check_dtype_accuracy(lrc: MyLogisticRegressionClass, dataset: TypedDataset, score: float,
+                         tolerance: float,
+                         scaling: Optional[Tuple[np.array, np.array]] = None) -> None:
+    """
+    The function trains a float64 model with the same parameters as the model and
+    checks that accuracy of the model differs from accuracy of float64 model
+    by no more than the tolerance. The program exits if the check is failed.
+
+    Args:
+        lrc: the trained model
+        dataset: the data set
+        score: accuracy of the model
+        tolerance: a tolerance of accuracy
+        scaling: means and standard deviations of features as for the model,
+          None to calculate them on the data set
+    """
+    print('Checking accuracy of', lrc.dtype, 'model against float64 model ...')
+    reference = copy.copy(lrc)
+    reference.dtype = np.dtype(np.float64)
+    reference.thetas = []
+    reference.n_iter_ = []
+    reference.checkpoint = None
+    data_x, data_y = reference.design_matrix(dataset.features, dataset.codes[TARGET_NAME],
+                                             scaling=scaling)
+    reference.fit_design(data_x, data_y, dataset.categories[TARGET_NAME])
+    reference_score = reference.score_design(data_x, data_y, dataset.categories[TARGET_NAME])
+    message = f'Score of float64 model = {reference_score}, difference = ' \
+              f'{abs(score - reference_score)}, tolerance = {tolerance}'
+    if abs(score - reference_score) > tolerance:
+        error_message(message)
+        sys.exit(1)
+    normal_message(message)
+
+
+def get_warm_scaling(warm_bundle: Optional[ModelBundle], features: List[str]) -> \
+        Optional[Tuple[np.array, np.array]]:
+    """
+    The function returns the scaling of training of a warm start model bundle:
+    its thetas are valid only for features scaled the same way.
+    Thetas files of old versions have no scaling: features are scaled by the data set.
+    The program exits if features of the bundle differ from features of the data set.
+
+    Args:
+        warm_bundle: a model to start training from, None without warm start
+        features: a list of names of features of the data set
+
+    Returns:
+        Means and standard deviations of features or None
+    """
+    if warm_bundle is None or warm_bundle.features is None:
+        return None
+    if warm_bundle.features != list(features):
+        error_message('Features of the warm start model ' + ', '.join(warm_bundle.features) +
+                      ' differ from features of the data set ' + ', '.join(features))
+        sys.exit(1)
+    return warm_bundle.model.scaling_
+
+
+def save_thetas(thetas: List, filename: str) -> None:
+    """
+    The function saves thetas of the model as in old versions: pairs of an array
+    and a name of class in .npy file
+
+    Args:
+        thetas: a list of pairs: thetas of a class and its name
+        filename: a name of file
+    """
+    thetas_array = np.empty(len(thetas), dtype=object)
+    for idx, item in enumerate(thetas):
+        thetas_array[idx] = item
+    np.save(filename, thetas_array)
+    success_message("Array of coefficients is saved to file " + filename + '.npy')
+
+
+def save_trained_model(args: argparse.Namespace, lrc: MyLogisticRegressionClass,
+                       features: List[str], feature_numbers: List[int]) -> None:
+    """
+    The function saves the trained model: a model bundle or old .npy thetas file
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        lrc: the trained model
+        features: a list of names of features
+        feature_numbers: a list of numbers of features
+    """
+    if args.legacy_thetas:
+        save_thetas(lrc.thetas, args.thetas_file)
+        return
+    save_model(args.thetas_file, lrc, features, feature_numbers)
+    success_message("Model is saved to directory " + args.thetas_file)
+
+
+def train_stream(args: argparse.Namespace, lrc: MyLogisticRegressionClass,
+                 warm_bundle: Optional[ModelBundle] = None) -> None:
+    """
+    The function trains the model on the data set read by blocks of rows:
+    the first pass calculates scaling of features, next passes are epochs of the solver
+
+    Args:
+        args: a list of the program parameters as argparse.Namespace object
+        lrc: the model
+        warm_bundle: a model to start training from, None to train without warm start
+    """
+    print('Scaling data by blocks ...')
+    scaling, houses, features, numbers = get_stream_scaling(args)
+    scaling = get_warm_scaling(warm_bundle, features) or scaling
+    print('Model fitting ...')
+    try:
+        lrc.fit_blocks(lambda: iter_design_blocks(args, lrc, scaling), houses)
+        save_trained_model(args, lrc, features, numbers)
+    except ValueError as exception:
+        error_message(str(exception))
+        sys.exit(1)
+    print('Accuracy scoring ...')
+    correct, total = 0, 0
+    for data_x, data_y in iter_design_blocks(args, lrc, scaling):
+        correct += int(np.sum(lrc.predict_design(data_x) ==
+                              np.asarray(houses)[data_y]))
+        total += len(data_y)
+    normal_message("Score = " + str(correct / total if total else 0.0))
+
+
 def do_main_function():
     """
     Main function of LOG_TRAIN command in the project.
@@ -22,18 +199,65 @@ def do_main_function():
     Selected (cleared) data is source for the model
     """
     args = options_parse_model()
+    warm_start, warm_bundle = None, None
+    if args.warm_start is not None:
+        try:
+            warm_bundle = load_model(args.warm_start)
+        except (OSError, ValueError):
+            error_message('It is impossible to load thetas for warm start from file ' +
+                          args.warm_start)
+            sys.exit(1)
+        warm_start = warm_bundle.model.thetas
+        print('Warm start from thetas of houses ', ', '.join(str(label)
+                                                            for _, label in warm_start))
+    checkpoint = args.checkpoint
+    if checkpoint is None and args.resume:
+        checkpoint = args.thetas_file + '.checkpoint'
+    try:
+        lrc = MyLogisticRegressionClass(alpha=args.alpha, n_iter=args.n_iter, mode=args.mode,
+                                        jobs=args.jobs, solver=args.solver,
+                                        batch_size=args.batch_size, epochs=args.epochs,
+                                        eta0=args.eta0, schedule=args.schedule,
+                                        shuffle=args.shuffle, seed=args.seed,
+                                        stopping=EarlyStopping(args.tol, args.check_every,
+                                                               args.criterion),
+                                        optimizer=Optimizer(args.optimizer, args.momentum,
+                                                            args.beta1, args.beta2),
+                                        dtype=args.dtype, decay=args.decay, warm_start=warm_start,
+                                        checkpoint=checkpoint,
+                                        checkpoint_every=args.checkpoint_every,
+                                        resume=args.resume)
+    except ValueError as exception:
+        error_message(str(exception))
+        sys.exit(1)
+    if args.stream:
+        if args.solver not in STOCHASTIC_SOLVERS:
+            error_message('Stream mode requires a stochastic solver: minibatch or sgd')
+            sys.exit(1)
+        train_stream(args, lrc, warm_bundle)
+        print('Done!')
+        return
     print('Loading data ...')
-    dataset = load_csv(args, True)
+    dataset = load_csv_cached(args, True)
     print('Preprocessing data ...')
-    _, features, data = preprocessing(dataset)
-    print('Features are: ', features[1:])
-    lrc = MyLogisticRegressionClass()
+    houses = dataset.categories[TARGET_NAME]
+    print('Features are: ', dataset.feature_names)
+    scaling = get_warm_scaling(warm_bundle, dataset.feature_names)
+    data_x, data_y = lrc.design_matrix(dataset.features, dataset.codes[TARGET_NAME],
+                                       mmap_file=args.mmap_file, scaling=scaling)
     print('Model fitting ...')
-    thetas = lrc.fit(data, features)
-    np.save(args.thetas_file, thetas)
-    success_message("Array of coefficients is saved to file " + args.thetas_file + '.npy')
+    try:
+        lrc.fit_design(data_x, data_y, houses)
+        save_trained_model(args, lrc, dataset.feature_names,
+                           get_feature_numbers(dataset.header, dataset.feature_names))
+    except ValueError as exception:
+        error_message(str(exception))
+        sys.exit(1)
     print('Accuracy scoring ...')
-    normal_message("Score = " + str(lrc.score(data, features)))
+    score = lrc.score_design(data_x, data_y, houses)
+    normal_message("Score = " + str(score))
+    if args.dtype_check is not None and lrc.dtype != np.float64:
+        check_dtype_accuracy(lrc, dataset, score, args.dtype_check, scaling)
     print('Done!')
 
 
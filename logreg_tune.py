@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+The module contains LOGREG_TUNE script: it searches hyperparameters of the model by
+k-fold cross-validation over a grid of alpha steps, numbers of iterations and
+lists of features. The data set is parsed and scaled once and shared with worker
+processes through shared memory: a task of a worker is a fold of a configuration.
+The model of the best configuration is trained on all rows and saved as a model bundle.
+Each column is scaled by its mean and standard deviation over all its values, and
+the same scaling is used by cross-validation and by training of the best model.
+
+  Typical usage example:
+
+  ./logreg_tune.py dataset_train.csv model -f features_3.csv features_4.csv \
+      -a 5e-5 1e-4 -n 10000 30000 -k 5 -j 4
+"""
+
+import io
+import sys
+import time
+import itertools
+import contextlib
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np  # type: ignore
+from csv_utils import get_feature_list, get_feature_numbers, select_features
+from dataset_cache import load_csv_cached
+from data_utils import TARGET_NAME
+from logreg import MyLogisticRegressionClass
+from model_store import save_model
+from parallel_utils import ArrayDescriptor, SharedArray, attach_array, run_in_pool
+from stream_funcs import error_message, success_message, normal_message
+from arg_utils import options_parse_tune
+
+
+class Configuration(NamedTuple):
+    """
+    Configuration is a point of the grid of hyperparameters
+
+    Attributes:
+        features: a name of file with a list of numbers of features, None for all features
+        alpha: an alpha step
+        n_iter: a number of iterations
+    """
+    features: Optional[str]
+    alpha: float
+    n_iter: int
+
+
+def _fold_task(task: Tuple[ArrayDescriptor, ArrayDescriptor, ArrayDescriptor, List[str],
+                           List[int], int, Configuration, str, str]) -> Tuple[float, float]:
+    """
+    The function is a task of a worker process: it trains the model of a configuration on
+    all folds except one and scores it on the fold. The scaled matrix of features,
+    codes of classes and numbers of folds of rows are in shared memory.
+    Rows with nan values of selected features are skipped.
+
+    Args:
+        task: descriptors of the matrix of features, of codes of classes and of numbers
+          of folds, names of classes, columns of selected features, a number of the fold,
+          a configuration, a mode and a solver of training
+
+    Returns:
+        Accuracy on the fold
+        time of training and scoring in seconds
+    """
+    x_descriptor, y_descriptor, f_descriptor, classes, columns, fold, config, mode, solver = task
+    x_shm, features = attach_array(x_descriptor)
+    y_shm, codes = attach_array(y_descriptor)
+    f_shm, folds = attach_array(f_descriptor)
+    try:
+        started = time.perf_counter()
+        selected = features[:, columns]
+        rows = ~np.isnan(selected).any(axis=1)
+        design = np.column_stack((np.ones(len(selected)), selected))
+        train, test = rows & (folds != fold), rows & (folds == fold)
+        lrc = MyLogisticRegressionClass(alpha=config.alpha, n_iter=config.n_iter, mode=mode,
+                                        solver=solver)
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            lrc.fit_design(design[train], codes[train], classes)
+        score = lrc.score_design(design[test], codes[test], classes)
+        return float(score), time.perf_counter() - started
+    finally:
+        del features, codes, folds
+        x_shm.close()
+        y_shm.close()
+        f_shm.close()
+
+
+def _columns(numbers: List[int], features: Optional[str]) -> List[int]:
+    """
+    The function returns columns of the matrix of all features which are selected
+    by a file with a list of numbers of features
+
+    Args:
+        numbers: numbers of all features of the matrix
+        features: a name of file with a list of numbers of features, None for all features
+
+    Returns:
+        A list of columns
+    """
+    selected = get_feature_list(features) if features is not None else []
+    return [column for column, number in enumerate(numbers)
+            if not selected or number in selected]
+
+
+def report(results: List[Tuple[Configuration, np.array, np.array]]) -> None:
+    """
+    The function prints accuracy and time of folds for each configuration
+
+    Args:
+        results: a list of configurations with accuracies and times of their folds
+    """
+    for config, scores, seconds in results:
+        normal_message(f'features={config.features or "all"} alpha={config.alpha:g} '
+                       f'n_iter={config.n_iter}: accuracy={np.mean(scores):.4f} '
+                       f'(std {np.std(scores):.4f}), time of folds: ' +
+                       ' '.join(f'{item:.2f}' for item in seconds) + ' s')
+
+
+def do_main_function():
+    """
+    The main function of the script
+    """
+    args = options_parse_tune()
+    if args.folds < 2:
+        error_message('A number of folds has to be at least 2')
+        sys.exit(1)
+    print('Loading data ...')
+    dataset = load_csv_cached(args)
+    classes = dataset.categories[TARGET_NAME]
+    numbers = get_feature_numbers(dataset.header, dataset.feature_names)
+    configs = [Configuration(*item)
+               for item in itertools.product(args.features, args.alpha, args.n_iter)]
+    columns = {name: _columns(numbers, name) for name in args.features}
+    print('Scaling data ...')
+    features = np.array(dataset.features, dtype=np.float64)
+    mean, std = MyLogisticRegressionClass._scaling(features)
+    folds = np.random.default_rng(args.seed).permutation(len(features)) % args.folds
+    print('Cross-validation of', len(configs), 'configurations on', args.folds, 'folds in',
+          args.jobs, 'processes ...')
+    started = time.perf_counter()
+    with SharedArray(features) as shared_x, \
+            SharedArray(np.asarray(dataset.codes[TARGET_NAME])) as shared_y, \
+            SharedArray(folds) as shared_f:
+        tasks = [(shared_x.descriptor, shared_y.descriptor, shared_f.descriptor, classes,
+                  columns[config.features], fold, config, args.mode, args.solver)
+                 for config in configs for fold in range(args.folds)]
+        outcomes = np.array(run_in_pool(_fold_task, tasks, args.jobs)) \
+            .reshape(len(configs), args.folds, 2)
+    print('Cross-validation is done in', round(time.perf_counter() - started, 2), 's')
+    results = [(config, outcome[:, 0], outcome[:, 1])
+               for config, outcome in zip(configs, outcomes)]
+    report(results)
+    best = max(results, key=lambda item: np.mean(item[1]))[0]
+    success_message(f'The best configuration: features={best.features or "all"} '
+                    f'alpha={best.alpha:g} n_iter={best.n_iter}')
+
+    print('Model fitting on all rows ...')
+    best_columns = columns[best.features]
+    best_numbers = [numbers[column] for column in best_columns]
+    subset = select_features(dataset, best_numbers)
+    lrc = MyLogisticRegressionClass(alpha=best.alpha, n_iter=best.n_iter, mode=args.mode,
+                                    solver=args.solver)
+    data_x, data_y = lrc.design_matrix(subset.features, subset.codes[TARGET_NAME],
+                                       scaling=(mean[best_columns], std[best_columns]))
+    lrc.fit_design(data_x, data_y, classes)
+    save_model(args.model, lrc, subset.feature_names, best_numbers)
+    success_message('Model is saved to directory ' + args.model)
+
+
+if __name__ == '__main__':
+    do_main_function()
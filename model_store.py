@@ -0,0 +1,112 @@
+"""
+The module contains functions to save and to load a model bundle: a self-contained
+trained model as a set of arrays of NPY_STORE module. A bundle keeps a float matrix of
+thetas (a column for each class), means and standard deviations of features of
+the training set, names of classes, names and numbers of features.
+A bundle is loaded with memory mapping and without pickle, so prediction needs
+neither a pass of statistics over the data set nor parsing of Python objects.
+Thetas saved by old versions (.npy array of pairs) are loaded as a model without scaling.
+
+  Typical usage example:
+
+  save_model(path, lrc, feature_names, feature_numbers)
+  bundle = load_model(path)
+  predictions = bundle.model.predict_features(features)
+"""
+
+from typing import List, NamedTuple, Optional
+import numpy as np  # type: ignore
+from logreg import MyLogisticRegressionClass, load_thetas
+from npy_store import save_arrays, load_arrays, load_header
+
+MODEL_FORMAT = 'dslr-logreg'
+MODEL_VERSION = 1
+
+
+class ModelBundle(NamedTuple):
+    """
+    ModelBundle is a loaded model
+
+    Attributes:
+        model: the model with thetas and the scaling of training
+        features: a list of names of features, None for old thetas files
+        feature_numbers: a list of numbers of features as in a file with numbers of features,
+          None for old thetas files
+    """
+    model: MyLogisticRegressionClass
+    features: Optional[List[str]]
+    feature_numbers: Optional[List[int]]
+
+
+def is_model_bundle(path: str) -> bool:
+    """
+    The function checks whether the path is a model bundle
+
+    Args:
+        path: a name of file or directory
+
+    Returns:
+        True if the path is a model bundle
+    """
+    header = load_header(path)
+    return header is not None and header.get('format') == MODEL_FORMAT
+
+
+def save_model(path: str, lrc: MyLogisticRegressionClass, features: List[str],
+               feature_numbers: List[int]) -> None:
+    """
+    The function saves a trained model as a model bundle, an old bundle is replaced
+
+    Args:
+        path: a name of the bundle directory
+        lrc: the trained model, its scaling_ has to be known
+        features: a list of names of features of the model
+        feature_numbers: a list of numbers of features as in a file with numbers of features
+
+    Raises:
+        ValueError: the scaling of training is unknown
+    """
+    if lrc.scaling_ is None:
+        raise ValueError('The scaling of training is unknown')
+    mean, std = lrc.scaling_
+    save_arrays(path, {'thetas': lrc.theta_matrix(),
+                       'mean': np.asarray(mean, dtype=np.float64),
+                       'std': np.asarray(std, dtype=np.float64)},
+                {'format': MODEL_FORMAT, 'version': MODEL_VERSION,
+                 'classes': [str(label) for label in lrc.classes_],
+                 'features': list(features),
+                 'feature_numbers': [int(number) for number in feature_numbers],
+                 'mode': lrc.mode,
+                 'dtype': str(lrc.dtype)})
+
+
+def load_model(path: str, dtype: Optional[str] = None) -> ModelBundle:
+    """
+    The function loads a model from a model bundle or from an old .npy thetas file.
+    Arrays of a bundle are memory-mapped.
+
+    Args:
+        path: a name of the bundle directory or of .npy file
+        dtype: a float type of computations of the model, None to use the type of training
+
+    Returns:
+        A loaded model
+
+    Raises:
+        OSError: the file is absent or damaged
+        ValueError: the file is damaged or it has unknown version
+    """
+    if not is_model_bundle(path):
+        thetas = load_thetas(path)
+        return ModelBundle(model=MyLogisticRegressionClass(thetas=thetas,
+                                                           dtype=dtype or 'float64'),
+                           features=None, feature_numbers=None)
+    arrays, header = load_arrays(path)
+    if header.get('version') != MODEL_VERSION:
+        raise ValueError(f'{path}: unknown version of the model')
+    thetas = [(arrays['thetas'][:, idx], label) for idx, label in enumerate(header['classes'])]
+    model = MyLogisticRegressionClass(thetas=thetas, mode=header['mode'],
+                                      dtype=dtype or header['dtype'],
+                                      scaling=(arrays['mean'], arrays['std']))
+    return ModelBundle(model=model, features=header['features'],
+                       feature_numbers=header['feature_numbers'])
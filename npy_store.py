@@ -0,0 +1,146 @@
+"""
+The module contains functions to save and to load a set of NUMPY arrays as a directory:
+each array is saved to its own .npy file, a small header is saved to header.json file.
+The directory is written to a temporary place and renamed, so readers never see
+a partially written set. An old set is renamed aside before the new one is renamed in
+and removed after it, so an interrupted replacement always leaves one complete set:
+the old set is found aside if the new one is not in place yet.
+Arrays are loaded with memory mapping and without pickle.
+
+  Typical usage examples:
+
+  save_arrays(path, {'features': features}, {'version': 1})
+  arrays, header = load_arrays(path)
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from typing import Dict, Tuple, Optional
+import numpy as np  # type: ignore
+
+HEADER_FILE = 'header.json'
+
+
+def _aside_path(path: str) -> str:
+    """
+    The function returns a name of directory for an old set of arrays while it is replaced
+
+    Args:
+        path: a name of the directory
+
+    Returns:
+        A name of the directory aside
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    return os.path.join(parent, '.' + name + '.old')
+
+
+def find_arrays(path: str) -> Optional[str]:
+    """
+    The function returns a name of directory which keeps a set of arrays: the directory itself
+    or the old set aside if a replacement of the set was interrupted
+
+    Args:
+        path: a name of the directory
+
+    Returns:
+        A name of directory or None if there is no set
+    """
+    for candidate in (path, _aside_path(path)):
+        if os.path.isdir(candidate):
+            return candidate
+    return None
+
+
+def save_arrays(path: str, arrays: Dict[str, np.array], header: dict) -> None:
+    """
+    The function saves arrays and a header to a directory atomically.
+    An old directory with the same name is replaced.
+
+    Args:
+        path: a name of the directory
+        arrays: a dictionary: a name of an array -> the array
+        header: a dictionary with additional information, it has to be serializable to JSON
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, name + '.npy'), np.asarray(array), allow_pickle=False)
+        with open(os.path.join(tmp_path, HEADER_FILE), 'w') as header_file:
+            json.dump(dict(header, arrays=list(arrays)), header_file)
+        aside_path = _aside_path(path)
+        if os.path.isdir(path):
+            if os.path.isdir(aside_path):
+                shutil.rmtree(aside_path)
+            os.replace(path, aside_path)
+        os.replace(tmp_path, path)
+        if os.path.isdir(aside_path):
+            shutil.rmtree(aside_path)
+    finally:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+
+
+def load_header(path: str) -> Optional[dict]:
+    """
+    The function loads a header of a set of arrays
+
+    Args:
+        path: a name of the directory
+
+    Returns:
+        A header as a dictionary or None if the directory is absent or damaged
+    """
+    found = find_arrays(path)
+    if found is None:
+        return None
+    try:
+        with open(os.path.join(found, HEADER_FILE)) as header_file:
+            return json.load(header_file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_header(path: str, header: dict) -> None:
+    """
+    The function replaces a header of a set of arrays atomically
+
+    Args:
+        path: a name of the directory
+        header: a dictionary with additional information, it has to be serializable to JSON
+    """
+    path = find_arrays(path) or path
+    tmp_file = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(tmp_file, 'w') as header_file:
+        json.dump(header, header_file)
+    os.replace(tmp_file, os.path.join(path, HEADER_FILE))
+
+
+def load_arrays(path: str, mmap_mode: Optional[str] = 'r') -> Tuple[Dict[str, np.array], dict]:
+    """
+    The function loads arrays and a header from a directory
+
+    Args:
+        path: a name of the directory
+        mmap_mode: a mode of memory mapping as for numpy.load, None to load arrays in memory
+
+    Returns:
+        - a dictionary: a name of an array -> the array
+        - a header as a dictionary
+
+    Raises:
+        OSError: the directory is absent or damaged
+        ValueError: a file of an array is damaged
+    """
+    header = load_header(path)
+    if header is None:
+        raise OSError(f'{path}: a set of arrays is absent or damaged')
+    path = find_arrays(path) or path
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode,
+                            allow_pickle=False)
+              for name in header['arrays']}
+    return arrays, header
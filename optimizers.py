@@ -0,0 +1,412 @@
+"""
+The module contains optimizers of the logistic regression:
+    - update rules of gradient descent: plain steps, momentum and Adam
+    - gradient descent with backtracking control of the step size
+    - second-order and quasi-Newton solvers: damped Newton (IRLS) and L-BFGS
+Solvers with a line search minimize the mean log loss of a matrix of thetas
+(a column for each class), second-order solvers converge in tens of iterations.
+Only NUMPY is used.
+
+  Typical usage example:
+
+  step = Optimizer('adam').updater(thetas.shape)
+  thetas += step(gradient, alpha)
+
+  objective = LogisticObjective(data_x, targets, multinomial=False)
+  thetas, n_iter = newton(objective, np.zeros((columns, classes)), 100, 1e-6)
+  thetas, n_iter = lbfgs(objective, np.zeros((columns, classes)), 100, 1e-6)
+"""
+
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+import numpy as np  # type: ignore
+
+OPTIMIZERS = ['gd', 'momentum', 'adam', 'backtracking']
+DEFAULT_TOL = 1e-6
+LBFGS_MEMORY = 10
+RIDGE = 1e-10
+ARMIJO = 1e-4
+SHRINK = 0.5
+MAX_LINE_STEPS = 60
+
+
+class Optimizer(NamedTuple):
+    """
+    Optimizer defines an update rule of gradient descent
+
+    Attributes:
+        method: 'gd' for plain steps, 'momentum' for steps with momentum, 'adam' for Adam,
+          'backtracking' for plain steps with the step size found by a line search
+        momentum: a coefficient of momentum
+        beta1: a decay rate of the first moment of Adam
+        beta2: a decay rate of the second moment of Adam
+        epsilon: a term of Adam to avoid division by zero
+    """
+    method: str = 'gd'
+    momentum: float = 0.9
+    beta1: float = 0.9
+    beta2: float = 0.999
+    epsilon: float = 1e-8
+
+    def updater(self, shape: Tuple[int, ...], dtype: np.dtype = np.float64) -> 'Updater':
+        """
+        The method creates an update rule with its state for thetas
+
+        Args:
+            shape: a shape of thetas
+            dtype: a float type of thetas
+
+        Returns:
+            An update rule
+        """
+        return Updater(self, shape, dtype)
+
+
+class Updater:
+    """
+    The class of an update rule of gradient descent: it turns a gradient into a step of thetas.
+    The rule keeps its state (a velocity or moments) between steps.
+
+    Attributes:
+        optimizer: a definition of the rule
+        state: a dictionary of arrays of the state: a name of an array -> the array
+    """
+    def __init__(self, optimizer: Optimizer, shape: Tuple[int, ...],
+                 dtype: np.dtype = np.float64) -> None:
+        """
+        Initializes the rule with the initial state
+        """
+        self.optimizer = optimizer
+        self.state: Dict[str, np.array] = {}
+        if optimizer.method == 'momentum':
+            self.state['velocity'] = np.zeros(shape, dtype=dtype)
+        elif optimizer.method == 'adam':
+            self.state['first'] = np.zeros(shape, dtype=dtype)
+            self.state['second'] = np.zeros(shape, dtype=dtype)
+            self.state['count'] = np.zeros(1, dtype=np.int64)
+
+    def load(self, arrays: Dict[str, np.array]) -> None:
+        """
+        The method restores the state of the rule, e.g. from a checkpoint
+
+        Args:
+            arrays: a dictionary of arrays which contains arrays of the state
+        """
+        for name, array in self.state.items():
+            array[...] = arrays[name]
+
+    def freeze(self, columns: np.array) -> None:
+        """
+        The method resets the state of frozen columns of thetas (e.g. converged classes),
+        so a saved velocity does not move them anymore
+
+        Args:
+            columns: a boolean mask of frozen columns
+        """
+        for array in self.state.values():
+            if array.ndim == 2 and array.shape[1] == len(columns):
+                array[:, columns] = 0
+
+    def __call__(self, gradient: np.array, rate: np.array) -> np.array:
+        """
+        The method turns a gradient into a step: the gradient is changed in place
+
+        Args:
+            gradient: a gradient
+            rate: a learning rate: a number or an array which is broadcast to the gradient
+
+        Returns:
+            The step
+        """
+        optimizer = self.optimizer
+        if optimizer.method == 'momentum':
+            velocity = self.state['velocity']
+            velocity *= optimizer.momentum
+            gradient *= rate
+            velocity += gradient
+            gradient[...] = velocity
+            return gradient
+        if optimizer.method == 'adam':
+            first, second, count = self.state['first'], self.state['second'], self.state['count']
+            count += 1
+            first *= optimizer.beta1
+            first += (1 - optimizer.beta1) * gradient
+            second *= optimizer.beta2
+            second += (1 - optimizer.beta2) * gradient * gradient
+            correction = np.sqrt(1 - optimizer.beta2 ** int(count[0])) / \
+                (1 - optimizer.beta1 ** int(count[0]))
+            np.sqrt(second, out=gradient)
+            gradient += optimizer.epsilon
+            np.divide(first, gradient, out=gradient)
+            gradient *= rate * correction
+            return gradient
+        gradient *= rate
+        return gradient
+
+
+class LogisticObjective:
+    """
+    The class of the objective of the logistic regression: the mean log loss
+    of one-vs-rest classifiers (a sum over classes) or of the softmax model
+
+    Attributes:
+        data_x: a design matrix
+        targets: a one-hot target matrix
+        multinomial: whether the model is the softmax model
+        probabilities: probabilities of classes for rows at the last evaluation
+    """
+    def __init__(self, data_x: np.array, targets: np.array, multinomial: bool = False) -> None:
+        """
+        Initializes the objective for a design matrix and a target matrix
+        """
+        self.data_x = data_x
+        self.targets = targets
+        self.multinomial = multinomial
+        self.probabilities = np.empty(targets.shape, dtype=targets.dtype)
+
+    def __call__(self, thetas: np.array) -> Tuple[float, np.array]:
+        """
+        The method calculates the objective and its gradient for a matrix of thetas
+
+        Args:
+            thetas: a matrix of thetas: a column for each class
+
+        Returns:
+            the mean log loss
+            the gradient of the mean log loss: the same shape as thetas
+        """
+        rows = max(len(self.data_x), 1)
+        output = np.dot(self.data_x, thetas)
+        if self.multinomial:
+            top = output.max(axis=1, keepdims=True)
+            log_sum = top + np.log(np.sum(np.exp(output - top), axis=1, keepdims=True))
+            loss = np.sum(log_sum) - np.sum(self.targets * output)
+            np.exp(output - log_sum, out=self.probabilities)
+        else:
+            loss = np.sum(np.logaddexp(0, output)) - np.sum(self.targets * output)
+            np.exp(-np.logaddexp(0, -output), out=self.probabilities)
+        gradient = np.dot(self.data_x.T, self.probabilities - self.targets) / rows
+        return float(loss / rows), gradient
+
+
+def gradient_norm(gradient: np.array) -> float:
+    """
+    The function returns the largest norm of columns of a gradient:
+    a measure of convergence of all classifiers
+
+    Args:
+        gradient: a gradient: a column for each class
+
+    Returns:
+        A norm
+    """
+    return float(np.max(np.sqrt(np.sum(gradient * gradient, axis=0)), initial=0.0))
+
+
+def backtracking(objective: LogisticObjective, thetas: np.array, loss: float,
+                 gradient: np.array, direction: np.array, step: float = 1.0) -> \
+        Optional[Tuple[np.array, float, np.array, float]]:
+    """
+    The function searches a step along a direction by backtracking:
+    the step is shrunk until the objective decreases enough (the Armijo condition)
+
+    Args:
+        objective: the objective
+        thetas: a current matrix of thetas
+        loss: the objective at thetas
+        gradient: the gradient at thetas
+        direction: a direction of descent
+        step: the initial step
+
+    Returns:
+        new thetas, the objective and the gradient at new thetas and the step,
+        None if there is no step to decrease the objective
+    """
+    slope = float(np.sum(gradient * direction))
+    if slope >= 0:
+        return None
+    for _ in range(MAX_LINE_STEPS):
+        candidate = thetas + step * direction
+        new_loss, new_gradient = objective(candidate)
+        if new_loss <= loss + ARMIJO * step * slope:
+            return candidate, new_loss, new_gradient, step
+        step *= SHRINK
+    return None
+
+
+def _stalled(previous: float, loss: float, dtype: np.dtype) -> bool:
+    """
+    The function checks that a decrease of the objective is below precision of the dtype:
+    e.g. a float32 model can not reach a small tolerance of the gradient
+
+    Args:
+        previous: the objective before a step
+        loss: the objective after the step
+        dtype: a float type of computations
+
+    Returns:
+        True if the decrease is negligible
+    """
+    return previous - loss <= np.finfo(dtype).eps * max(abs(loss), 1.0)
+
+
+def backtracking_descent(objective: LogisticObjective, thetas: np.array, n_iter: int,
+                         tol: float = DEFAULT_TOL, step: float = 1.0) -> Tuple[np.array, int]:
+    """
+    The function minimizes the objective by gradient descent with backtracking control
+    of the step size: each step is shrunk until the objective decreases enough,
+    the next iteration starts from the doubled accepted step
+
+    Args:
+        objective: the objective
+        thetas: initial thetas
+        n_iter: max quantity of iterations
+        tol: a tolerance: the method stops when the norm of the gradient is less than tol
+        step: the initial step
+
+    Returns:
+        A matrix of thetas
+        quantity of done iterations
+    """
+    thetas = np.array(thetas)
+    loss, gradient = objective(thetas)
+    for iteration in range(n_iter):
+        if gradient_norm(gradient) < tol:
+            return thetas, iteration
+        result = backtracking(objective, thetas, loss, gradient, -gradient, step)
+        if result is None:
+            return thetas, iteration
+        previous = loss
+        thetas, loss, gradient, step = result
+        if _stalled(previous, loss, thetas.dtype):
+            return thetas, iteration + 1
+        step /= SHRINK
+    return thetas, n_iter
+
+
+def _newton_direction(objective: LogisticObjective, gradient: np.array) -> np.array:
+    """
+    The function calculates the Newton direction: the gradient multiplied by
+    the inverse Hessian. For one-vs-rest classifiers the Hessian is block-diagonal,
+    so there is a small system for each class. For the softmax model there is
+    a single system for all classes.
+
+    Args:
+        objective: the objective which was evaluated at current thetas
+        gradient: the gradient at current thetas
+
+    Returns:
+        A direction: the same shape as the gradient
+    """
+    data_x, probabilities = objective.data_x, objective.probabilities
+    rows, columns = data_x.shape
+    classes = probabilities.shape[1]
+    eye = np.eye(columns)
+    if not objective.multinomial:
+        direction = np.empty_like(gradient)
+        for idx in range(classes):
+            weights = probabilities[:, idx] * (1 - probabilities[:, idx])
+            hessian = np.dot(data_x.T * weights, data_x) / max(rows, 1)
+            direction[:, idx] = np.linalg.solve(hessian + RIDGE * eye, -gradient[:, idx])
+        return direction
+    hessian = np.empty((classes * columns, classes * columns), dtype=gradient.dtype)
+    for first in range(classes):
+        for second in range(classes):
+            weights = probabilities[:, first] * (float(first == second) -
+                                                 probabilities[:, second])
+            hessian[first * columns:(first + 1) * columns,
+                    second * columns:(second + 1) * columns] = \
+                np.dot(data_x.T * weights, data_x) / max(rows, 1)
+    hessian += RIDGE * np.eye(classes * columns)
+    direction = np.linalg.lstsq(hessian, -gradient.reshape(-1, order='F'), rcond=None)[0]
+    return direction.reshape(gradient.shape, order='F')
+
+
+def newton(objective: LogisticObjective, thetas: np.array, n_iter: int,
+           tol: float = DEFAULT_TOL) -> Tuple[np.array, int]:
+    """
+    The function minimizes the objective by the damped Newton method (IRLS):
+    each iteration solves a system with the Hessian of the objective and
+    makes a step along the Newton direction with a backtracking line search
+
+    Args:
+        objective: the objective
+        thetas: initial thetas
+        n_iter: max quantity of iterations
+        tol: a tolerance: the method stops when the norm of the gradient is less than tol
+
+    Returns:
+        A matrix of thetas
+        quantity of done iterations
+    """
+    thetas = np.array(thetas)
+    loss, gradient = objective(thetas)
+    for iteration in range(n_iter):
+        if gradient_norm(gradient) < tol:
+            return thetas, iteration
+        result = backtracking(objective, thetas, loss, gradient,
+                              _newton_direction(objective, gradient))
+        if result is None:
+            return thetas, iteration
+        previous = loss
+        thetas, loss, gradient, _ = result
+        if _stalled(previous, loss, thetas.dtype):
+            return thetas, iteration + 1
+    return thetas, n_iter
+
+
+def lbfgs(objective: LogisticObjective, thetas: np.array, n_iter: int,
+          tol: float = DEFAULT_TOL, memory: int = LBFGS_MEMORY) -> Tuple[np.array, int]:
+    """
+    The function minimizes the objective by L-BFGS: the inverse Hessian is approximated
+    by the last pairs of differences of thetas and gradients (the two-loop recursion),
+    a step along the direction is found by a backtracking line search
+
+    Args:
+        objective: the objective
+        thetas: initial thetas
+        n_iter: max quantity of iterations
+        tol: a tolerance: the method stops when the norm of the gradient is less than tol
+        memory: a quantity of kept pairs of differences
+
+    Returns:
+        A matrix of thetas
+        quantity of done iterations
+    """
+    thetas = np.array(thetas)
+    loss, gradient = objective(thetas)
+    history: Deque[Tuple[np.array, np.array, float]] = deque(maxlen=memory)
+    for iteration in range(n_iter):
+        if gradient_norm(gradient) < tol:
+            return thetas, iteration
+        direction = -gradient
+        coefficients = []
+        for diff_thetas, diff_gradient, rho in reversed(history):
+            coefficient = rho * float(np.sum(diff_thetas * direction))
+            direction -= coefficient * diff_gradient
+            coefficients.append(coefficient)
+        if history:
+            diff_thetas, diff_gradient, _ = history[-1]
+            direction *= float(np.sum(diff_thetas * diff_gradient) /
+                               np.sum(diff_gradient * diff_gradient))
+        else:
+            direction /= max(1.0, float(np.sqrt(np.sum(gradient * gradient))))
+        for (diff_thetas, diff_gradient, rho), coefficient in zip(history,
+                                                                  reversed(coefficients)):
+            direction += (coefficient - rho * float(np.sum(diff_gradient * direction))) * \
+                diff_thetas
+        result = backtracking(objective, thetas, loss, gradient, direction)
+        if result is None:
+            if not history:
+                return thetas, iteration
+            history.clear()
+            continue
+        previous = loss
+        new_thetas, loss, new_gradient, _ = result
+        if _stalled(previous, loss, new_thetas.dtype):
+            return new_thetas, iteration + 1
+        curvature = float(np.sum((new_thetas - thetas) * (new_gradient - gradient)))
+        if curvature > 0:
+            history.append((new_thetas - thetas, new_gradient - gradient, 1 / curvature))
+        thetas, gradient = new_thetas, new_gradient
+    return thetas, n_iter
@@ -17,8 +17,8 @@ This file should be used as the argument for LOGREG_TRAIN and LOGREG_PREDICT scr
 from typing import List
 import numpy as np  # type: ignore
 import matplotlib.pyplot as plt  # type: ignore
-from csv_utils import load_csv
-from data_utils import preprocessing, get_house_data, get_one_pair_house_data
+from dataset_cache import load_csv_cached
+from data_utils import preprocessing_typed, get_house_data, get_one_pair_house_data
 from arg_utils import options_parse_f
 
 
@@ -98,8 +98,8 @@ def do_main_function() -> None:
     Main function of PAIR_PLOT command in DSLR project
     """
     args = options_parse_f()
-    dataset = load_csv(args)
-    houses, features, data = preprocessing(dataset)
+    dataset = load_csv_cached(args)
+    houses, features, data = preprocessing_typed(dataset)
     data_house = get_house_data(data, houses)
 
     pair_plot(houses, features, data_house)
@@ -0,0 +1,95 @@
+"""
+The module contains functions to run tasks in a pool of worker processes
+which share NUMPY arrays through shared memory instead of pickling them into each task.
+
+  Typical usage example:
+
+  with SharedArray(data) as shared:
+      results = run_in_pool(function, [(shared.descriptor, task) for task in tasks], jobs)
+
+  def function(task):
+      shm, data = attach_array(task[0])
+      ...
+"""
+
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import numpy as np  # type: ignore
+
+ArrayDescriptor = Tuple[str, Tuple[int, ...], str, str]
+
+
+class SharedArray:
+    """
+    The class copies an array to shared memory. It is a context manager:
+    the shared memory is released at the exit of the context.
+
+    Attributes:
+        shm: a shared memory object
+        array: the array in shared memory
+        descriptor: a description of the array to attach it in other processes
+    """
+    def __init__(self, array: np.array, order: Optional[str] = None) -> None:
+        """
+        Initializes SharedArray class: allocates shared memory and copies the array
+        in defined memory order ('C' or 'F'), by default the order of the array is kept
+        """
+        array = np.asarray(array)
+        if order is None:
+            order = 'F' if array.flags['F_CONTIGUOUS'] and not array.flags['C_CONTIGUOUS'] \
+                else 'C'
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, order=order)
+        self.array[...] = array
+        self.descriptor: ArrayDescriptor = (self.shm.name, array.shape, array.dtype.str, order)
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        The method releases the shared memory
+        """
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_array(descriptor: ArrayDescriptor) -> Tuple[shared_memory.SharedMemory, np.array]:
+    """
+    The function attaches an array in shared memory by its descriptor.
+    The shared memory object has to be closed after all views of the array are deleted.
+
+    Args:
+        descriptor: a description of the array
+
+    Returns:
+        - a shared memory object
+        - the array
+    """
+    name, shape, dtype, order = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, order=order)
+
+
+def run_in_pool(function: Callable, tasks: List[Any], jobs: int) -> List[Any]:
+    """
+    The function runs tasks in a pool of worker processes.
+    Results are returned in the order of tasks.
+
+    Args:
+        function: a function of one argument, it has to be defined at module level
+        tasks: a list of arguments for the function
+        jobs: a number of worker processes
+
+    Returns:
+        A list of results
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        return [function(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        return list(pool.map(function, tasks))
@@ -17,8 +17,8 @@ from typing import List
 from math import sqrt
 import numpy as np  # type: ignore
 import matplotlib.pyplot as plt  # type: ignore
-from csv_utils import load_csv
-from data_utils import preprocessing, get_house_data
+from dataset_cache import load_csv_cached
+from data_utils import preprocessing_typed, get_house_data
 from arg_utils import options_parse_fa
 from fmath import mean_
 
@@ -62,8 +62,8 @@ def calc_and_plot(houses: List[str], features: np.array, data_house: List[np.arr
     data_y: List[np.array] = []
     for house_idx, _ in enumerate(houses):
         data_single_house = data_house[house_idx]
-        data_x.append(np.array(data_single_house[:, idx], dtype=float))
-        data_y.append(np.array(data_single_house[:, idx_vs], dtype=float))
+        data_x.append(data_single_house[:, idx])
+        data_y.append(data_single_house[:, idx_vs])
     plot_scatter(data_x, data_y, legend=houses,
                  title=features[idx] + "(" + str(idx) + ") vs " +
                  features[idx_vs] + "(" + str(idx_vs) + ")",
@@ -119,8 +119,8 @@ def do_main_function():
     Main function of SCATTER_PLOT script in logistic regression project
     """
     args = options_parse_fa()
-    dataset = load_csv(args)
-    houses, features, data = preprocessing(dataset)
+    dataset = load_csv_cached(args)
+    houses, features, data = preprocessing_typed(dataset)
     house_data = get_house_data(data, houses)
 
     plt.gcf().canvas.set_window_title('Scatter Matrix')
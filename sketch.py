@@ -0,0 +1,201 @@
+"""
+The module contains QuantileSketch class: a KLL-style sketch to approximate quantiles
+of a stream of numbers in bounded memory.
+Items are kept in levels, an item of level h has weight 2^h. A full level is compacted:
+its items are sorted, every second item (with a random offset) is moved to the next level,
+other items are dropped. Capacities of levels decrease geometrically from the top level,
+so the sketch keeps O(k) items regardless of a quantity of items in the stream.
+Sketches are mergeable: a sketch of a union of streams is a merge of their sketches.
+
+  Typical usage example:
+
+  sketch = QuantileSketch()
+  sketch.update(values)
+  sketch.merge(other_sketch)
+  values = sketch.quantiles(ranks)
+  error = sketch.rank_error()
+"""
+
+import math
+from typing import List, Dict
+import numpy as np  # type: ignore
+
+DEFAULT_K = 1024
+CAPACITY_DECAY = 2 / 3
+MIN_CAPACITY = 8
+
+
+class QuantileSketch:
+    """
+    The class of a KLL-style quantile sketch
+
+    Attributes:
+        k: a capacity of the top level, it defines accuracy of the sketch
+        seed: a seed for random offsets of compactions
+        levels: a list of arrays of items, an item of level h has weight 2^h
+        count: a quantity of items added to the sketch
+        compactions: a quantity of compactions, it is used to generate random offsets
+        variance: a sum of squared weights of compactions: each compaction changes
+          a rank of any value by 0 or by its weight with random sign
+    """
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0) -> None:
+        """
+        Initializes an empty sketch
+        """
+        self.k = k
+        self.seed = seed
+        self.levels: List[np.array] = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self.compactions = 0
+        self.variance = 0.0
+
+    def _capacity(self, level: int) -> int:
+        """
+        The method returns a capacity of a level: the top level has capacity k,
+        lower levels have geometrically decreasing capacities
+
+        Args:
+            level: a number of level
+
+        Returns:
+            A capacity of the level
+        """
+        depth = len(self.levels) - 1 - level
+        return max(MIN_CAPACITY, int(math.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    def _compress(self) -> None:
+        """
+        The method compacts levels which exceed their capacities, from the bottom to the top
+        """
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) > self._capacity(level):
+                    self._compact(level)
+                    compacted = True
+
+    def _compact(self, level: int) -> None:
+        """
+        The method compacts a level: sorts its items and moves every second item
+        to the next level, the random offset defines which items are moved.
+        The largest item of odd quantity of items stays at the level.
+
+        Args:
+            level: a number of level
+        """
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        items = np.sort(self.levels[level])
+        if len(items) % 2:
+            kept, items = items[-1:], items[:-1]
+        else:
+            kept = np.empty(0, dtype=np.float64)
+        rng = np.random.default_rng([self.seed, self.compactions])
+        promoted = items[int(rng.integers(2))::2]
+        self.levels[level] = kept
+        self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+        self.compactions += 1
+        self.variance += float(4 ** level)
+
+    def update(self, values: np.array) -> None:
+        """
+        The method adds numbers to the sketch, nan values are skipped
+
+        Args:
+            values: an array of numbers
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        The method merges other sketch to the sketch
+
+        Args:
+            other: a sketch of other stream
+        """
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float64))
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self.variance += other.variance
+        self.compactions += other.compactions
+        self._compress()
+
+    def quantiles(self, ranks: np.array) -> np.array:
+        """
+        The method returns approximate values which have defined ranks in the sorted stream
+
+        Args:
+            ranks: ranks of values: from 1 to the quantity of items
+
+        Returns:
+            An array of values, nan for ranks out of the quantity of items
+        """
+        ranks = np.asarray(ranks, dtype=np.float64)
+        if not self.count:
+            return np.full(ranks.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(values), 2.0 ** level)
+                                  for level, values in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, ranks * cumulative[-1] / self.count)
+        values = items[order][np.minimum(positions, len(items) - 1)]
+        return np.where((ranks >= 1) & (ranks <= self.count), values, np.nan)
+
+    def rank_error(self, confidence: float = 0.99) -> float:
+        """
+        The method returns a bound of an error of rank of approximate quantiles
+        as a fraction of the quantity of items (Hoeffding bound for random compactions)
+
+        Args:
+            confidence: a probability that the error is less than the bound
+
+        Returns:
+            A bound of the rank error as a fraction
+        """
+        if not self.count:
+            return 0.0
+        return math.sqrt(2 * math.log(2 / (1 - confidence)) * self.variance) / self.count
+
+    def to_arrays(self) -> Dict[str, np.array]:
+        """
+        The method returns a state of the sketch as arrays
+
+        Returns:
+            A dictionary: a name of an array -> the array
+        """
+        return {'items': np.concatenate(self.levels),
+                'sizes': np.array([len(items) for items in self.levels], dtype=np.int64),
+                'state': np.array([self.k, self.seed, self.count, self.compactions],
+                                  dtype=np.int64),
+                'variance': np.array([self.variance], dtype=np.float64)}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.array]) -> 'QuantileSketch':
+        """
+        The method restores a sketch from its state as arrays
+
+        Args:
+            arrays: a dictionary returned by to_arrays method
+
+        Returns:
+            A sketch
+        """
+        k, seed, count, compactions = (int(value) for value in arrays['state'])
+        sketch = cls(k, seed)
+        bounds = np.cumsum(np.concatenate(([0], arrays['sizes'])))
+        sketch.levels = [np.array(arrays['items'][bounds[idx]:bounds[idx + 1]], dtype=np.float64)
+                         for idx in range(len(arrays['sizes']))]
+        sketch.count = count
+        sketch.compactions = compactions
+        sketch.variance = float(arrays['variance'][0])
+        return sketch
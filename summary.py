@@ -0,0 +1,228 @@
+"""
+The module contains StreamSummary class: mergeable statistics of numerical columns.
+For each column it keeps a count, a mean, a sum of squared deviations (M2), min, max
+and a quantile sketch. Blocks of rows are added by Chan's parallel update of moments,
+summaries of parts of a data set are merged the same way, so memory does not depend
+on a quantity of rows.
+
+  Typical usage example:
+
+  summary = StreamSummary(features)
+  for block in blocks:
+      summary.update(block)
+  summary.merge(other_summary)
+  table = summary.table(functions)
+"""
+
+from typing import List, Dict, Tuple
+import numpy as np  # type: ignore
+from fmath import count_, min_, max_, split_points
+from sketch import QuantileSketch, DEFAULT_K
+from describe_engine import StatsTable, check_functions, get_percentage
+
+
+class StreamSummary:
+    """
+    The class of mergeable statistics of numerical columns
+
+    Attributes:
+        features: a list of names of columns
+        count: quantities of not nan items of columns
+        mean: means of columns
+        m2: sums of squared deviations from means of columns
+        min: min values of columns
+        max: max values of columns
+        sketches: quantile sketches of columns
+    """
+    def __init__(self, features: List[str], k: int = DEFAULT_K) -> None:
+        """
+        Initializes an empty summary
+        """
+        self.features = list(features)
+        size = len(self.features)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size, dtype=np.float64)
+        self.m2 = np.zeros(size, dtype=np.float64)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+        self.sketches = [QuantileSketch(k, seed) for seed in range(size)]
+
+    def _combine(self, count: np.array, mean: np.array, m2: np.array,
+                 min_value: np.array, max_value: np.array) -> None:
+        """
+        The method combines moments of other part of data with the summary
+        by Chan's parallel algorithm
+
+        Args:
+            count: quantities of not nan items of columns of the part
+            mean: means of columns of the part
+            m2: sums of squared deviations of columns of the part
+            min_value: min values of columns of the part
+            max_value: max values of columns of the part
+        """
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            ratio = np.where(total > 0, count / np.maximum(total, 1), 0.0)
+            self.mean = np.where(count > 0, self.mean + delta * ratio, self.mean)
+            self.m2 = np.where(count > 0, self.m2 + m2 + delta * delta * self.count * ratio,
+                               self.m2)
+        self.count = total
+        self.min = np.fmin(self.min, min_value)
+        self.max = np.fmax(self.max, max_value)
+
+    def update_moments(self, block: np.array) -> None:
+        """
+        The method adds a block of rows to moments, min and max of the summary
+        without quantile sketches, nan values are skipped
+
+        Args:
+            block: a float matrix: rows are observations, columns are features
+        """
+        block = np.asarray(block, dtype=np.float64).reshape(-1, len(self.features))
+        if not len(block):
+            return
+        count = count_(block, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nansum(block, axis=0) / count
+            deviation = block - mean
+            m2 = np.nansum(deviation * deviation, axis=0)
+        self._combine(count, np.nan_to_num(mean), m2, min_(block, 0), max_(block, 0))
+
+    def update(self, block: np.array) -> None:
+        """
+        The method adds a block of rows to the summary, nan values are skipped
+
+        Args:
+            block: a float matrix: rows are observations, columns are features
+        """
+        block = np.asarray(block, dtype=np.float64).reshape(-1, len(self.features))
+        if not len(block):
+            return
+        self.update_moments(block)
+        for idx, sketch in enumerate(self.sketches):
+            sketch.update(block[:, idx])
+
+    def merge(self, other: 'StreamSummary') -> None:
+        """
+        The method merges a summary of other part of data with the summary
+
+        Args:
+            other: a summary with the same features
+        """
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+
+    def scaling(self) -> Tuple[np.array, np.array]:
+        """
+        The method returns means and standard deviations of columns
+
+        Returns:
+            means of columns
+            standard deviations of columns
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.mean, np.nan), np.sqrt(self.m2 / self.count)
+
+    def numerical(self) -> np.array:
+        """
+        The method marks columns with numerical data: not nan and not zero values
+
+        Returns:
+            A boolean array
+        """
+        return (self.count > 0) & ~((self.min == 0) & (self.max == 0))
+
+    def rank_error(self) -> np.array:
+        """
+        The method returns bounds of rank errors of approximate percentiles of columns
+
+        Returns:
+            A float array of bounds as fractions
+        """
+        return np.array([sketch.rank_error() for sketch in self.sketches])
+
+    def table(self, functions: List[str]) -> StatsTable:
+        """
+        The method returns a table of statistics for all columns.
+        Count, mean, std, min and max are exact, percentiles are approximate.
+
+        Args:
+            functions: a list of names of statistics: 'Count', 'Mean', 'Std', 'Min', 'Max'
+              and percentiles like '25%'
+
+        Returns:
+            A table of statistics
+        """
+        check_functions(functions)
+        values = np.empty((len(functions), len(self.features)), dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moments = {'Count': self.count,
+                       'Mean': np.where(self.count > 0, self.mean, np.nan),
+                       'Std': np.sqrt(self.m2 / self.count),
+                       'Min': self.min,
+                       'Max': self.max}
+        for row, function in enumerate(functions):
+            percentage = get_percentage(function)
+            if percentage is None:
+                values[row] = moments[function]
+                continue
+            ranks = split_points(self.count, [percentage])[0] + 1
+            values[row] = [sketch.quantiles([rank])[0]
+                           for sketch, rank in zip(self.sketches, ranks)]
+        return StatsTable(features=self.features, functions=list(functions), values=values)
+
+    def select(self, columns: List[int]) -> 'StreamSummary':
+        """
+        The method returns a summary of selected columns
+
+        Args:
+            columns: indexes of columns
+
+        Returns:
+            A summary which shares sketches with the summary
+        """
+        summary = StreamSummary([self.features[idx] for idx in columns])
+        summary.count = self.count[columns]
+        summary.mean = self.mean[columns]
+        summary.m2 = self.m2[columns]
+        summary.min = self.min[columns]
+        summary.max = self.max[columns]
+        summary.sketches = [self.sketches[idx] for idx in columns]
+        return summary
+
+    def to_arrays(self) -> Dict[str, np.array]:
+        """
+        The method returns a state of the summary as arrays
+
+        Returns:
+            A dictionary: a name of an array -> the array
+        """
+        arrays = {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                  'min': self.min, 'max': self.max}
+        for idx, sketch in enumerate(self.sketches):
+            for name, array in sketch.to_arrays().items():
+                arrays[f'sketch_{idx}_{name}'] = array
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, features: List[str], arrays: Dict[str, np.array]) -> 'StreamSummary':
+        """
+        The method restores a summary from its state as arrays
+
+        Args:
+            features: a list of names of columns
+            arrays: a dictionary returned by to_arrays method
+
+        Returns:
+            A summary
+        """
+        summary = cls(features)
+        for name in ('count', 'mean', 'm2', 'min', 'max'):
+            setattr(summary, name, np.array(arrays[name]))
+        summary.sketches = [
+            QuantileSketch.from_arrays({name: arrays[f'sketch_{idx}_{name}']
+                                        for name in ('items', 'sizes', 'state', 'variance')})
+            for idx, _ in enumerate(features)]
+        return summary
@@ -0,0 +1,105 @@
+"""
+The module contains regression tests of checkpoints: an interrupted training is resumed
+bit-exactly and an interrupted replacement of a checkpoint keeps the old one
+
+  Typical usage example:
+
+  python -m pytest -q test_checkpoint.py
+"""
+
+import os
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+import logreg
+from logreg import MyLogisticRegressionClass, EarlyStopping
+from optimizers import Optimizer
+from checkpoint import save_checkpoint, load_checkpoint
+
+
+class Interrupt(Exception):
+    """
+    Interrupt is raised instead of a kill of training
+    """
+
+
+def _dataset() -> tuple:
+    """
+    The function returns a small data set: a design matrix, codes of classes and classes
+    """
+    rng = np.random.default_rng(1)
+    features = rng.normal(size=(200, 3))
+    codes = np.argmax(features + 0.7 * rng.normal(size=features.shape), axis=1)
+    data_x, data_y = MyLogisticRegressionClass().design_matrix(features, codes)
+    return data_x, data_y, ['a', 'b', 'c']
+
+
+def _model(checkpoint: str, resume: bool, case: tuple) -> MyLogisticRegressionClass:
+    """
+    The function returns a model which saves checkpoints
+    """
+    mode, solver, method, alpha, tol = case
+    return MyLogisticRegressionClass(alpha=alpha, n_iter=600, mode=mode, solver=solver,
+                                     epochs=10, batch_size=16, optimizer=Optimizer(method),
+                                     stopping=EarlyStopping(tol, 20), checkpoint=checkpoint,
+                                     checkpoint_every=40, resume=resume)
+
+
+@pytest.mark.parametrize('case', [('stacked', 'gd', 'adam', 3e-2, 1e-3),
+                                  ('stacked', 'gd', 'gd', 1e-3, 3e-3),
+                                  ('ovr', 'gd', 'momentum', 1e-3, 3e-3),
+                                  ('softmax', 'gd', 'gd', 1e-3, 3e-3),
+                                  ('stacked', 'minibatch', 'momentum', 0.0, None)])
+def test_resume_is_bit_exact(tmp_path, monkeypatch, case: tuple) -> None:
+    """
+    Training which is interrupted after a checkpoint (after early stopping of some classes)
+    and resumed gives the same thetas as training without interruption
+    """
+    data_x, data_y, classes = _dataset()
+    reference = _model(None, False, case)
+    reference.fit_design(data_x, data_y, classes)
+
+    saves = []
+
+    def interrupted_save(*args, **kwargs) -> None:
+        save_checkpoint(*args, **kwargs)
+        saves.append(1)
+        if len(saves) == 6:
+            raise Interrupt()
+
+    path = str(tmp_path / 'checkpoint')
+    monkeypatch.setattr(logreg, 'save_checkpoint', interrupted_save)
+    with pytest.raises(Interrupt):
+        _model(path, False, case).fit_design(data_x, data_y, classes)
+    monkeypatch.undo()
+    resumed = _model(path, True, case)
+    resumed.fit_design(data_x, data_y, classes)
+    np.testing.assert_array_equal(resumed.theta_matrix(), reference.theta_matrix())
+    assert list(resumed.n_iter_) == list(reference.n_iter_)
+
+
+def test_interrupted_replacement_keeps_old_checkpoint(tmp_path, monkeypatch) -> None:
+    """
+    A kill between renames of a replacement leaves the old checkpoint readable,
+    the next replacement cleans it up
+    """
+    path, config = str(tmp_path / 'checkpoint'), {'alpha': 0.1}
+    save_checkpoint(path, {'thetas': np.arange(3.0)}, config, {'iteration': 1})
+    replace, calls = os.replace, []
+
+    def interrupted_replace(source: str, target: str) -> None:
+        calls.append(source)
+        if len(calls) == 2:
+            raise Interrupt()
+        replace(source, target)
+
+    monkeypatch.setattr(os, 'replace', interrupted_replace)
+    with pytest.raises(Interrupt):
+        save_checkpoint(path, {'thetas': np.arange(3.0) + 10}, config, {'iteration': 2})
+    monkeypatch.undo()
+    assert not os.path.exists(path)
+    arrays, position = load_checkpoint(path, config)
+    np.testing.assert_array_equal(arrays['thetas'], np.arange(3.0))
+    assert position == {'iteration': 1}
+    save_checkpoint(path, {'thetas': np.arange(3.0) + 20}, config, {'iteration': 3})
+    assert os.listdir(str(tmp_path)) == ['checkpoint']
+    assert load_checkpoint(path, config)[1] == {'iteration': 3}
@@ -0,0 +1,96 @@
+"""
+The module contains regression tests of incremental DESCRIBE: offsets of blocks,
+an unterminated last line and checks of a saved state
+
+  Typical usage example:
+
+  python -m pytest -q test_describe_state.py
+"""
+
+import os
+import logging
+import argparse
+import numpy as np  # type: ignore
+from csv_utils import iter_csv_blocks
+from describe import get_stream_summary
+from describe_state import load_state
+
+HEADER = b'Index,Hogwarts House,First Name,Last Name,Birthday,Best Hand,Arithmancy,Astronomy\n'
+
+
+def _rows(first: int, last: int) -> bytes:
+    """
+    The function returns rows of a small data set, some values are empty
+    """
+    return b''.join(f'{idx},House{idx % 4},Name,Surname,2000-01-01,Left,'
+                    f'{idx * 1.5 if idx % 7 else ""},{-idx * 0.25}\n'.encode()
+                    for idx in range(first, last))
+
+
+def _args(filename: str, state: str = None) -> argparse.Namespace:
+    """
+    The function returns parameters of DESCRIBE for stream mode
+    """
+    return argparse.Namespace(filename_dataset=filename, stream=True, block_size=7,
+                              state=state, index=False, features_list_filename=None)
+
+
+def test_blocks_leave_unterminated_line(tmp_path) -> None:
+    """
+    With complete_rows the offset stops after the last line break and the tail is not read;
+    without it the tail is read as the last row
+    """
+    filename = str(tmp_path / 'data.csv')
+    complete = HEADER + _rows(0, 20)
+    with open(filename, 'wb') as data_file:
+        data_file.write(complete + b'20,House0,Name,Surname,2000-01-01,Left,30,-5')
+    blocks = list(iter_csv_blocks(_args(filename), block_size=7, complete_rows=True))
+    assert sum(len(block.features) for block, _ in blocks) == 20
+    assert blocks[-1][1] == len(complete)
+    blocks = list(iter_csv_blocks(_args(filename), block_size=7))
+    assert sum(len(block.features) for block, _ in blocks) == 21
+    assert blocks[-1][1] == os.path.getsize(filename)
+
+
+def test_state_reads_appended_rows_once(tmp_path) -> None:
+    """
+    A row which is appended in two writes is counted once: after the second write,
+    and the incremental summary equals the summary of the whole file
+    """
+    filename, state = str(tmp_path / 'data.csv'), str(tmp_path / 'state')
+    data = HEADER + _rows(0, 30)
+    cut = data.index(b'\n', len(data) // 2) + 5
+    with open(filename, 'wb') as data_file:
+        data_file.write(data[:cut])
+    logger = logging.getLogger('test')
+    partial = get_stream_summary(_args(filename, state), logger)
+    summary, offset = load_state(state, filename, False)
+    assert summary is not None and offset == data.rindex(b'\n', 0, cut) + 1
+    assert partial.count[1] == data[:offset].count(b'\n') - 1
+    with open(filename, 'ab') as data_file:
+        data_file.write(data[cut:])
+    incremental = get_stream_summary(_args(filename, state), logger)
+    whole = get_stream_summary(_args(filename), logger)
+    np.testing.assert_array_equal(incremental.count, whole.count)
+    np.testing.assert_allclose(incremental.mean, whole.mean, rtol=1e-12)
+    np.testing.assert_allclose(incremental.m2, whole.m2, rtol=1e-12)
+    assert load_state(state, filename, False)[1] == len(data)
+
+
+def test_state_is_out_of_date_after_change(tmp_path) -> None:
+    """
+    A state is not used if bytes before its offset are changed or the file is shorter
+    """
+    filename, state = str(tmp_path / 'data.csv'), str(tmp_path / 'state')
+    data = HEADER + _rows(0, 30)
+    with open(filename, 'wb') as data_file:
+        data_file.write(data)
+    get_stream_summary(_args(filename, state), logging.getLogger('test'))
+    assert load_state(state, filename, False)[1] == len(data)
+    assert load_state(state, filename, True) == (None, 0)
+    with open(filename, 'wb') as data_file:
+        data_file.write(data[:-3] + b'99\n')
+    assert load_state(state, filename, False) == (None, 0)
+    with open(filename, 'wb') as data_file:
+        data_file.write(data[:-10])
+    assert load_state(state, filename, False) == (None, 0)
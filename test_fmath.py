@@ -0,0 +1,93 @@
+"""
+The module contains regression tests of nan-aware kernels of FMATH module
+
+  Typical usage example:
+
+  python -m pytest -q test_fmath.py
+"""
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+from fmath import count_, mean_, std_, min_, max_, percentile_, percentiles_, moments_
+
+
+def _old_percentile(data: np.array, percentage: float) -> float:
+    """
+    The function is the percentile of old versions: it sorts the array without nan values
+    and takes the item at round(count * percentage / 100 + 0.5) - 1. Old versions failed
+    or wrapped around for positions out of the array, here they are nan.
+    """
+    data = np.sort(data[~np.isnan(data)])
+    position = int(round(len(data) * percentage / 100 + 0.5)) - 1
+    return data[position] if 0 <= position < len(data) else np.nan
+
+
+def _matrix(rows: int = 1001, columns: int = 5) -> np.array:
+    """
+    The function returns a float matrix with nan values and repeated values
+    """
+    rng = np.random.default_rng(0)
+    data = np.round(rng.normal(size=(rows, columns)) * 10, 1)
+    data[rng.random(data.shape) < 0.2] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 100, 1001])
+def test_percentile_matches_old_drop_nan(size: int) -> None:
+    """
+    Percentiles of an array with nan values are as percentiles of the array without them
+    """
+    data = _matrix(size, 1)[:, 0]
+    data[0] = 1.5
+    copy = data.copy()
+    for percentage in [0, 10, 25, 50, 75, 90, 99.9, 100]:
+        np.testing.assert_array_equal(percentile_(data, percentage),
+                                      _old_percentile(data, percentage))
+    np.testing.assert_array_equal(data, copy)
+
+
+@pytest.mark.parametrize('percentages', [[25, 50, 75], list(np.linspace(0, 100, 201))])
+def test_percentiles_of_columns(percentages: list) -> None:
+    """
+    Percentiles of columns by one selection (or by sorting for many positions) are
+    as percentiles of each column without nan values
+    """
+    data = _matrix()
+    result = percentiles_(data, percentages, axis=0)
+    expected = [[_old_percentile(data[:, column], percentage)
+                 for column in range(data.shape[1])] for percentage in percentages]
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_kernels_of_columns() -> None:
+    """
+    Count, mean, std, min and max skip nan values, an all-nan column gives nan
+    """
+    data = _matrix()
+    data[:, 2] = np.nan
+    for column in [0, 1, 3, 4]:
+        clean = data[:, column][~np.isnan(data[:, column])]
+        assert count_(data, 0)[column] == len(clean)
+        assert mean_(data, 0)[column] == pytest.approx(np.mean(clean), rel=1e-12)
+        assert std_(data, 0)[column] == pytest.approx(np.std(clean), rel=1e-12)
+        assert min_(data, 0)[column] == np.min(clean)
+        assert max_(data, 0)[column] == np.max(clean)
+    assert count_(data, 0)[2] == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        assert np.isnan(mean_(data, 0)[2]) and np.isnan(std_(data, 0)[2])
+    assert np.isnan(min_(data, 0)[2]) and np.isnan(percentile_(data[:, 2], 50))
+
+
+@pytest.mark.parametrize('block_rows', [1, 64, 1000, 4096])
+def test_moments_match_two_passes(block_rows: int) -> None:
+    """
+    Moments of one pass by blocks of rows are as count_, mean_ and std_ of two passes
+    """
+    data = _matrix()
+    data[:, 2] = np.nan
+    data[:, 3] += 1e6
+    counts, mean, std = moments_(data, block_rows)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.testing.assert_array_equal(counts, count_(data, 0))
+        np.testing.assert_allclose(mean, mean_(data, 0), rtol=1e-12)
+        np.testing.assert_allclose(std, std_(data, 0), rtol=1e-9)
@@ -0,0 +1,43 @@
+"""
+The module contains regression tests of training of MyLogisticRegressionClass
+
+  Typical usage example:
+
+  python -m pytest -q test_logreg.py
+"""
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+from logreg import MyLogisticRegressionClass, EarlyStopping
+from optimizers import Optimizer
+
+
+def _dataset() -> tuple:
+    """
+    The function returns a small data set: a design matrix, codes of classes and classes
+    """
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(300, 3))
+    codes = np.argmax(features + 0.7 * rng.normal(size=features.shape), axis=1)
+    data_x, data_y = MyLogisticRegressionClass().design_matrix(features, codes)
+    return data_x, data_y, ['a', 'b', 'c']
+
+
+@pytest.mark.parametrize('method, alpha, tol', [('gd', 1e-3, 3e-2),
+                                               ('momentum', 1e-3, 3e-2),
+                                               ('adam', 1e-2, 3e-2)])
+def test_stacked_matches_ovr_with_early_stopping(method: str, alpha: float, tol: float) -> None:
+    """
+    Stacked training freezes converged classes exactly as one-vs-rest training stops them
+    """
+    data_x, data_y, classes = _dataset()
+    results = {}
+    for mode in ['ovr', 'stacked']:
+        lrc = MyLogisticRegressionClass(alpha=alpha, n_iter=3000, mode=mode,
+                                        optimizer=Optimizer(method),
+                                        stopping=EarlyStopping(tol, 10))
+        lrc.fit_design(data_x, data_y, classes)
+        results[mode] = lrc.theta_matrix(), lrc.n_iter_
+    assert results['ovr'][1] == results['stacked'][1]
+    assert len(set(results['ovr'][1])) > 1
+    np.testing.assert_allclose(results['stacked'][0], results['ovr'][0], rtol=0, atol=1e-12)